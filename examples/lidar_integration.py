@@ -5,10 +5,11 @@ This shows how to adapt the sender script for a real lidar sensor.
 """
 import paho.mqtt.client as mqtt
 import time
-import json
+import msgpack
 import os
 import logging
 import threading
+import numpy as np
 
 # For lidar integration - example using RPLidar from Slamtec
 # pip install rplidar-py
@@ -29,10 +30,20 @@ DEVICE_ID = os.environ.get("DEVICE_ID", "raspi_lidar")
 LIDAR_PORT = os.environ.get("LIDAR_PORT", "/dev/ttyUSB0")
 PUBLISH_RATE = float(os.environ.get("PUBLISH_RATE", 5.0))  # Hz
 
+# Wire format version, sent as the first payload byte
+PAYLOAD_VERSION = 1
+
+# Scan buffers hold one distance slot per whole degree
+SCAN_SIZE = 360
+SCAN_DTYPE = np.dtype('<f4')  # Sent as-is in the "scan" field, so fixed little-endian
+
 # Global variables
 lidar = None
-latest_scan = {}
-scan_lock = threading.Lock()
+# The lidar thread fills scan_buffer (which only it touches) and then publishes
+# an immutable bytes snapshot with a single reference store, so the publisher
+# always sends a complete scan without taking a lock
+scan_buffer = np.zeros(SCAN_SIZE, dtype=SCAN_DTYPE)
+latest_scan = None
 running = True
 
 def lidar_thread():
@@ -58,16 +69,14 @@ def lidar_thread():
             if not running:
                 break
                 
-            # Process the scan data
-            scan_data = {}
+            # Fill the buffer, angles missing from this scan stay 0 (no return)
+            scan_buffer.fill(0)
             for (_, angle, distance) in scan:
-                # Round the angle to nearest integer for simplicity
-                angle_key = f"angle_{int(angle)}"
-                scan_data[angle_key] = distance
+                # Round the angle down to a whole degree for simplicity
+                scan_buffer[int(angle) % SCAN_SIZE] = distance
             
-            # Update the latest scan with thread safety
-            with scan_lock:
-                latest_scan = scan_data.copy()
+            # Hand a snapshot of the completed scan to the publisher
+            latest_scan = scan_buffer.tobytes()
     
     except Exception as e:
         logger.error(f"Error in lidar thread: {e}")
@@ -77,47 +86,54 @@ def lidar_thread():
             lidar.disconnect()
         logger.info("Lidar thread stopped")
 
+def encode_payload(data):
+    """Encode a message as a version byte followed by a MessagePack map"""
+    # The scan is already raw float32 bytes, so the map itself keeps
+    # double precision for the timestamps
+    return bytes([PAYLOAD_VERSION]) + msgpack.packb(data)
+
 def publish_thread(client):
     """Thread function to publish lidar data at a consistent rate"""
-    global latest_scan, running
+    global running
     
     logger.info(f"Starting publisher thread (rate: {PUBLISH_RATE} Hz)")
     
     message_id = 0
-    period = 1.0 / PUBLISH_RATE
+    period_ns = int(1e9 / PUBLISH_RATE)
     
     while running:
-        start_time = time.time()
-        
-        # Get a copy of the latest scan with thread safety
-        with scan_lock:
-            scan_data = latest_scan.copy()
+        deadline = time.monotonic_ns() + period_ns
         
-        # Only publish if we have data
-        if scan_data:
+        # Only publish once the lidar has completed a scan
+        if latest_scan is not None:
+            # Send the latest snapshot as raw bytes: one float32 distance per
+            # degree, 0 where there was no return. Read the reference once; the
+            # bytes object itself never changes
+            scan_bytes = latest_scan
+            
             # Prepare message payload
             data = {
                 "timestamp": time.time(),
                 "device_id": DEVICE_ID,
                 "message_id": message_id,
                 "send_time": time.time(),
-                "readings": scan_data
+                "scan": scan_bytes
             }
             
             # Publish
-            payload = json.dumps(data)
+            payload = encode_payload(data)
             client.publish(TOPIC, payload)
             
             # Log occasionally
             if message_id % 50 == 0:
-                logger.info(f"Published message {message_id} with {len(scan_data)} readings")
+                logger.info(f"Published message {message_id} with {np.count_nonzero(np.frombuffer(scan_bytes, dtype=SCAN_DTYPE))} readings")
             
             message_id += 1
         
         # Sleep to maintain consistent publishing rate
-        elapsed = time.time() - start_time
-        sleep_time = max(0, period - elapsed)
-        time.sleep(sleep_time)
+        sleep_ns = deadline - time.monotonic_ns()
+        if sleep_ns > 0:
+            time.sleep(sleep_ns / 1e9)
 
 def main():
     """Main function"""
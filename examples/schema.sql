@@ -14,16 +14,21 @@ CREATE TABLE IF NOT EXISTS sensor_data (
     receive_time REAL NOT NULL,        -- Time message was received
     message_id INTEGER,                -- Message sequence number
     device_id TEXT NOT NULL,           -- Source device identifier
-    latency_ms REAL                    -- Transmission latency in milliseconds
+    latency_ms REAL,                   -- Transmission latency in milliseconds
+    readings_blob BLOB,                -- Packed readings: float32 (angle, distance) pairs
+    readings_format TEXT               -- Layout of readings_blob (e.g. "float32:angle,distance")
 );
 
--- Sensor readings table - normalized storage of sensor values
+-- Sensor readings table - legacy one-row-per-reading storage
+-- (the receiver now packs readings into sensor_data.readings_blob)
 CREATE TABLE IF NOT EXISTS sensor_readings (
     data_id INTEGER NOT NULL,          -- Foreign key to sensor_data.id
     angle TEXT NOT NULL,               -- Angle identifier (e.g. "angle_90")
     value REAL NOT NULL,               -- Reading value (e.g. distance in cm)
-    FOREIGN KEY (data_id) REFERENCES sensor_data(id)
-);
+    angle_deg REAL,                    -- Numeric angle in degrees (e.g. 90), parsed from angle
+    PRIMARY KEY (data_id, angle),      -- Clusters rows by message, no separate data_id index needed
+    FOREIGN KEY (data_id) REFERENCES sensor_data(id) ON DELETE CASCADE
+) WITHOUT ROWID;
 
 -- Performance statistics table - periodic snapshots of system performance
 CREATE TABLE IF NOT EXISTS performance_stats (
@@ -40,7 +45,6 @@ CREATE TABLE IF NOT EXISTS performance_stats (
 -- Create indexes for better query performance
 CREATE INDEX idx_timestamp ON sensor_data(timestamp);
 CREATE INDEX idx_device ON sensor_data(device_id);
-CREATE INDEX idx_readings_data_id ON sensor_readings(data_id);
 
 -- Example queries
 
@@ -58,18 +62,15 @@ GROUP BY minute
 ORDER BY minute;
 
 -- Get latest readings for a specific device
+-- (decode the BLOB with numpy.frombuffer(blob, dtype='<f4').reshape(-1, 2))
 SELECT 
-    s.timestamp,
-    r.angle,
-    r.value
-FROM sensor_data s
-JOIN sensor_readings r ON s.id = r.data_id
-WHERE s.device_id = 'raspi_lidar'
-AND s.timestamp = (
-    SELECT MAX(timestamp) 
-    FROM sensor_data 
-    WHERE device_id = 'raspi_lidar'
-);
+    timestamp,
+    readings_blob
+FROM sensor_data
+WHERE device_id = 'raspi_lidar'
+AND readings_blob IS NOT NULL
+ORDER BY timestamp DESC
+LIMIT 1;
 
 -- Get throughput statistics by hour
 SELECT 
@@ -5,15 +5,20 @@ Receives and stores sensor data in SQLite database.
 """
 import paho.mqtt.client as mqtt
 import time
-import json
-import statistics
+import orjson
+import msgpack
 import os
+import re
 import sqlite3
 from datetime import datetime
 import pathlib
 import logging
 import signal
 import sys
+import threading
+import queue
+from collections import deque
+import numpy as np
 
 # Configure logging
 logging.basicConfig(
@@ -28,18 +33,68 @@ PORT = int(os.environ.get("BROKER_PORT", 1883))
 TOPIC = os.environ.get("TOPIC", "sensor/test")
 DATA_DIR = os.environ.get("DATA_DIR", "/data")
 DB_FILENAME = os.environ.get("DB_FILENAME", "sensor_data.db")
+COMMIT_BATCH_SIZE = int(os.environ.get("COMMIT_BATCH_SIZE", 50))  # Messages per transaction
+COMMIT_MAX_DELAY = float(os.environ.get("COMMIT_MAX_DELAY", 1.0))  # Max seconds before a partial batch commits
+LATENCY_WINDOW = int(os.environ.get("LATENCY_WINDOW", 10000))  # Latency samples kept for statistics
+MSG_QUEUE_SIZE = int(os.environ.get("MSG_QUEUE_SIZE", 10000))  # Messages buffered ahead of the DB writer
+WAL_CHECKPOINT_INTERVAL = float(os.environ.get("WAL_CHECKPOINT_INTERVAL", 30))  # Seconds between WAL checkpoints
+WAL_CHECKPOINT_MAX_SKIPS = 4  # Rounds skipped for a writer backlog before a checkpoint runs anyway
+WAL_AUTOCHECKPOINT_PAGES = 10000  # SQLite's own checkpoint, a backstop if the checkpoint thread falls behind
+
+# Readings are stored as one BLOB per message: little-endian float32 (angle, distance) pairs
+READINGS_FORMAT = "float32:angle,distance"
+READINGS_DTYPE = np.dtype('<f4')
+
+# Readings keys of the form "angle_<deg>"; other keys can't be packed and are skipped
+ANGLE_KEY_PATTERN = re.compile(r'angle_[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?')
+
+# Statement text is kept in constants so sqlite3's statement cache is hit on every insert
+SQL_INSERT_SENSOR_DATA = '''
+INSERT INTO sensor_data 
+(timestamp, receive_time, message_id, device_id, latency_ms, readings_blob, readings_format)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+SQL_INSERT_PERFORMANCE_STATS = '''
+INSERT INTO performance_stats
+(timestamp, message_count, avg_latency, min_latency, max_latency, p95_latency, throughput)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Statements kept in sqlite3's per-connection cache (the default is 128)
+SQL_CACHED_STATEMENTS = 256
+
+# Range of SQLite's 64-bit INTEGER
+SQLITE_INT_MIN = -2**63
+SQLITE_INT_MAX = 2**63 - 1
+
+# MessagePack payloads start with this version byte; anything else is parsed as legacy JSON
+PAYLOAD_VERSION = 1
 
 # Statistics tracking
-latencies = []
+latencies = deque(maxlen=LATENCY_WINDOW)  # Bounded so memory and stats cost stay flat
 message_counts = 0
 start_time = None
 last_report_time = time.time()
 reporting_interval = 5  # Report stats every 5 seconds
 
-# Global DB connection
+# Global DB connection (only used from the writer thread once it is running)
 db_connection = None
 db_cursor = None
 
+# Messages handed from the MQTT network thread to the DB writer thread
+msg_queue = queue.Queue(maxsize=MSG_QUEUE_SIZE)
+dropped_messages = 0
+writer_thread = None
+STOP_WRITER = None  # Queue sentinel that tells the writer to finish
+
+# Background WAL checkpointing, kept off the writer's connection
+checkpoint_thread = None
+checkpoint_stop = threading.Event()
+
+# Scratch array reused by pack_readings; only the writer thread packs readings
+readings_scratch = np.empty((360, 2), dtype=READINGS_DTYPE)
+
 def ensure_db_schema(db_cursor):
     """Ensure the database has the correct schema"""
     try:
@@ -51,9 +106,6 @@ def ensure_db_schema(db_cursor):
             # Enable foreign keys
             db_cursor.execute("PRAGMA foreign_keys = ON")
             
-            # Use WAL mode for better performance
-            db_cursor.execute("PRAGMA journal_mode = WAL")
-            
             # Create sensor_data table
             db_cursor.execute('''
             CREATE TABLE sensor_data (
@@ -62,18 +114,24 @@ def ensure_db_schema(db_cursor):
                 receive_time REAL NOT NULL,
                 message_id INTEGER,
                 device_id TEXT NOT NULL,
-                latency_ms REAL
+                latency_ms REAL,
+                readings_blob BLOB,
+                readings_format TEXT
             )
             ''')
             
-            # Create sensor_readings table
+            # Create sensor_readings table (legacy one-row-per-reading storage,
+            # kept so older databases and tools keep working). Rows are clustered
+            # by message, so the primary key also serves joins on data_id
             db_cursor.execute('''
             CREATE TABLE sensor_readings (
                 data_id INTEGER NOT NULL,
                 angle TEXT NOT NULL,
                 value REAL NOT NULL,
-                FOREIGN KEY (data_id) REFERENCES sensor_data(id)
-            )
+                angle_deg REAL,
+                PRIMARY KEY (data_id, angle),
+                FOREIGN KEY (data_id) REFERENCES sensor_data(id) ON DELETE CASCADE
+            ) WITHOUT ROWID
             ''')
             
             # Create performance_stats table
@@ -93,7 +151,6 @@ def ensure_db_schema(db_cursor):
             # Create indexes
             db_cursor.execute('CREATE INDEX idx_timestamp ON sensor_data(timestamp)')
             db_cursor.execute('CREATE INDEX idx_device ON sensor_data(device_id)')
-            db_cursor.execute('CREATE INDEX idx_readings_data_id ON sensor_readings(data_id)')
             
             logger.info("Database schema created successfully")
         else:
@@ -102,8 +159,49 @@ def ensure_db_schema(db_cursor):
             # Ensure foreign keys are enabled
             db_cursor.execute("PRAGMA foreign_keys = ON")
             
+            # Add the packed readings columns to databases created before they existed
+            db_cursor.execute("PRAGMA table_info(sensor_data)")
+            columns = {row[1] for row in db_cursor.fetchall()}
+            if "readings_blob" not in columns:
+                logger.info("Adding packed readings columns to sensor_data")
+                # One transaction, so a crash can't leave just one of the columns behind
+                db_cursor.execute("BEGIN IMMEDIATE")
+                db_cursor.execute("ALTER TABLE sensor_data ADD COLUMN readings_blob BLOB")
+                db_cursor.execute("ALTER TABLE sensor_data ADD COLUMN readings_format TEXT")
+                db_cursor.execute("COMMIT")
+            
+            # Store the legacy readings' angles as numbers so readers don't parse "angle_<deg>"
+            db_cursor.execute("PRAGMA table_info(sensor_readings)")
+            columns = {row[1] for row in db_cursor.fetchall()}
+            if columns and "angle_deg" not in columns:
+                logger.info("Adding numeric angle column to sensor_readings")
+                # One transaction, so a crash can't leave the column added but never filled
+                db_cursor.execute("BEGIN IMMEDIATE")
+                db_cursor.execute("ALTER TABLE sensor_readings ADD COLUMN angle_deg REAL")
+                db_cursor.execute(
+                    "UPDATE sensor_readings SET angle_deg = CAST(substr(angle, 7) AS REAL) "
+                    "WHERE angle LIKE 'angle!_%' ESCAPE '!'"
+                )
+                db_cursor.execute("COMMIT")
+            
+            # The dashboard, analyzer and helper's prune and export all filter on timestamp
+            db_cursor.execute("CREATE INDEX IF NOT EXISTS idx_timestamp ON sensor_data(timestamp)")
+            
+            # Older rowid tables get a covering index so a scan's readings are read
+            # from the index alone; WITHOUT ROWID tables are already clustered by data_id
+            db_cursor.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='sensor_readings'")
+            row = db_cursor.fetchone()
+            if row and "WITHOUT ROWID" not in row[0].upper():
+                db_cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_readings_scan ON sensor_readings(data_id, angle_deg, value)"
+                )
+                # The covering index also serves every lookup the data_id index did
+                db_cursor.execute("DROP INDEX IF EXISTS idx_readings_data_id")
+            
     except sqlite3.Error as e:
         logger.error(f"Error setting up database schema: {e}")
+        if db_cursor.connection.in_transaction:
+            db_cursor.execute("ROLLBACK")
         raise
 
 def setup_database():
@@ -116,11 +214,48 @@ def setup_database():
     # Database file path
     db_path = os.path.join(DATA_DIR, DB_FILENAME)
     
+    # The connection is opened here and then used only by the writer thread,
+    # which any SQLite build except a single-threaded one supports
+    if sqlite3.threadsafety == 0:
+        raise RuntimeError("SQLite library is built single-threaded, the DB writer thread can't use it")
+    
     try:
         # Connect to database with optimal settings
-        db_connection = sqlite3.connect(db_path)
+        # check_same_thread is off because the writer thread uses the connection opened here.
+        # isolation_level=None stops the sqlite3 module from issuing implicit BEGINs;
+        # the writer opens and commits each batch transaction itself
+        db_connection = sqlite3.connect(
+            db_path, isolation_level=None, check_same_thread=False,
+            cached_statements=SQL_CACHED_STATEMENTS
+        )
         db_cursor = db_connection.cursor()
         
+        # Use WAL mode so commits append to the log instead of rewriting pages,
+        # and so readers (analyzer, visualizer) don't block the receiver
+        db_cursor.execute("PRAGMA journal_mode = WAL")
+        
+        # In WAL mode NORMAL only syncs at checkpoints, which is still safe
+        # against corruption and avoids an fsync per commit
+        db_cursor.execute("PRAGMA synchronous = NORMAL")
+        
+        # Keep temporary tables and indexes in memory
+        db_cursor.execute("PRAGMA temp_store = MEMORY")
+        
+        # 64 MiB page cache (negative value is in KiB)
+        db_cursor.execute("PRAGMA cache_size = -65536")
+        
+        # Memory-map up to 256 MiB of the database file
+        db_cursor.execute("PRAGMA mmap_size = 268435456")
+        
+        # wal_checkpointer runs checkpoints on its own connection so the writer
+        # rarely pays for one mid-batch; SQLite's automatic checkpoint only
+        # kicks in if the WAL still grows past WAL_AUTOCHECKPOINT_PAGES
+        db_cursor.execute(f"PRAGMA wal_autocheckpoint = {WAL_AUTOCHECKPOINT_PAGES}")
+        
+        journal_mode = db_cursor.execute("PRAGMA journal_mode").fetchone()[0]
+        if journal_mode.lower() != "wal":
+            logger.warning(f"WAL mode not enabled, journal_mode is '{journal_mode}'")
+        
         # Ensure schema exists
         ensure_db_schema(db_cursor)
         
@@ -137,8 +272,10 @@ def close_database():
     global db_connection
     
     if db_connection:
-        db_connection.commit()
+        if db_connection.in_transaction:
+            db_connection.execute("COMMIT")
         db_connection.close()
+        db_connection = None
         logger.info("Database connection closed")
 
 def on_connect(client, userdata, flags, rc):
@@ -149,14 +286,168 @@ def on_connect(client, userdata, flags, rc):
     global start_time
     start_time = time.time()
 
+def decode_payload(payload):
+    """Decode a versioned MessagePack payload, or a legacy JSON one"""
+    if payload and payload[0] == PAYLOAD_VERSION:
+        # Unpack through a memoryview so skipping the version byte doesn't copy the payload
+        data = msgpack.unpackb(memoryview(payload)[1:], raw=False)
+        
+        # Readings travel as a nested single-precision MessagePack map
+        if isinstance(data.get("readings"), bytes):
+            data["readings"] = msgpack.unpackb(data["readings"], raw=False)
+        return data
+    
+    return orjson.loads(payload)
+
 def on_message(client, userdata, msg):
     """Callback for when a message is received from the broker"""
-    global message_counts, latencies, last_report_time, db_connection, db_cursor
+    global dropped_messages
+    
+    # Only timestamp and enqueue here so the network loop never waits on SQLite;
+    # decoding and storage happen on the writer thread
+    try:
+        msg_queue.put_nowait((time.time(), msg.payload))
+    except queue.Full:
+        dropped_messages += 1
+        if dropped_messages % 100 == 1:
+            logger.warning(f"Message queue full, dropped {dropped_messages} messages so far")
+
+def db_writer():
+    """Drain the message queue and store messages in batched transactions"""
+    global last_report_time
+    
+    logger.info("DB writer thread started")
+    
+    while True:
+        # Wait for the first message of the next batch
+        try:
+            item = msg_queue.get(timeout=reporting_interval)
+        except queue.Empty:
+            continue
+        
+        # Keep collecting until the batch is full or has waited COMMIT_MAX_DELAY
+        batch = [item]
+        deadline = time.monotonic() + COMMIT_MAX_DELAY
+        while batch[-1] is not STOP_WRITER and len(batch) < COMMIT_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(msg_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        
+        stopping = batch[-1] is STOP_WRITER
+        if stopping:
+            batch.pop()
+        
+        # Nothing may end this thread early: the MQTT callback keeps queuing
+        # messages that only this loop drains
+        try:
+            if batch:
+                write_batch(batch)
+            
+            # Report statistics periodically
+            if time.time() - last_report_time > reporting_interval:
+                report_statistics()
+                last_report_time = time.time()
+        except Exception as e:
+            logger.error(f"DB writer error: {e}")
+            if db_connection.in_transaction:
+                db_cursor.execute("ROLLBACK")
+        
+        if stopping:
+            break
+    
+    logger.info("DB writer thread stopped")
+
+def stop_writer():
+    """Ask the writer thread to flush the queue and wait for it to finish"""
+    if writer_thread and writer_thread.is_alive():
+        msg_queue.put(STOP_WRITER)
+        writer_thread.join()
+
+def wal_checkpointer(db_path):
+    """Periodically copy the WAL into the database and truncate it"""
+    logger.info("WAL checkpoint thread started")
+    
+    try:
+        connection = sqlite3.connect(db_path, isolation_level=None)
+    except sqlite3.Error as e:
+        logger.error(f"WAL checkpoint thread could not open the database: {e}")
+        return
+    
+    skipped = 0
+    try:
+        while not checkpoint_stop.wait(WAL_CHECKPOINT_INTERVAL):
+            # Leave the database to the writer while it has a backlog, but not
+            # for so long under sustained load that the WAL keeps growing
+            if msg_queue.qsize() >= COMMIT_BATCH_SIZE and skipped < WAL_CHECKPOINT_MAX_SKIPS:
+                skipped += 1
+                continue
+            skipped = 0
+            
+            try:
+                busy, log_pages, checkpointed = connection.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+                if busy:
+                    logger.warning(f"WAL checkpoint incomplete: {checkpointed} of {log_pages} pages copied")
+            except sqlite3.Error as e:
+                logger.error(f"WAL checkpoint error: {e}")
+    finally:
+        connection.close()
+    
+    logger.info("WAL checkpoint thread stopped")
+
+def stop_checkpointer():
+    """Stop the WAL checkpoint thread and wait for it to finish"""
+    checkpoint_stop.set()
+    if checkpoint_thread and checkpoint_thread.is_alive():
+        checkpoint_thread.join()
+
+def write_batch(batch):
+    """Decode and store a batch of queued messages in one transaction"""
+    # Decode the whole batch before taking the write lock
+    rows = [process_message(receive_time, payload) for receive_time, payload in batch]
+    rows = [row for row in rows if row is not None]
+    if not rows:
+        return
     
-    # Parse the received message
-    receive_time = time.time()
     try:
-        data = json.loads(msg.payload)
+        # Take the write lock up front so the batch can't fail halfway on SQLITE_BUSY
+        db_cursor.execute("BEGIN IMMEDIATE")
+        
+        # Insert every row through one prepared statement
+        db_cursor.executemany(SQL_INSERT_SENSOR_DATA, rows)
+        
+        db_cursor.execute("COMMIT")
+    except Exception as e:
+        logger.error(f"Error writing batch of {len(rows)} messages, retrying one at a time: {e}")
+        if db_connection.in_transaction:
+            db_cursor.execute("ROLLBACK")
+        write_rows_one_by_one(rows)
+
+def write_rows_one_by_one(rows):
+    """Store rows in one transaction, dropping only the rows SQLite rejects"""
+    try:
+        db_cursor.execute("BEGIN IMMEDIATE")
+        for row in rows:
+            try:
+                db_cursor.execute(SQL_INSERT_SENSOR_DATA, row)
+            except (sqlite3.IntegrityError, sqlite3.InterfaceError, sqlite3.ProgrammingError,
+                    OverflowError, ValueError, TypeError) as e:
+                logger.error(f"Dropping message that could not be stored: {e}")
+        db_cursor.execute("COMMIT")
+    except Exception as e:
+        logger.error(f"Database error while writing batch: {e}")
+        if db_connection.in_transaction:
+            db_cursor.execute("ROLLBACK")
+
+def process_message(receive_time, payload):
+    """Decode a queued message, track its latency and return its sensor_data row"""
+    global message_counts
+    
+    try:
+        data = decode_payload(payload)
         
         # Calculate latency
         latency = None
@@ -166,64 +457,84 @@ def on_message(client, userdata, msg):
         
         message_counts += 1
         
-        # Store data in SQLite
-        store_message(data, receive_time, latency)
-        
         # Print occasional message details
         if message_counts % 100 == 0:
             logger.info(f"Received message {message_counts}: {data.get('message_id')}")
         
-        # Report statistics periodically
-        if time.time() - last_report_time > reporting_interval:
-            report_statistics()
-            last_report_time = time.time()
+        return message_row(data, receive_time, latency)
             
-    except json.JSONDecodeError:
-        logger.error(f"Error decoding message: {msg.payload}")
+    except (ValueError, msgpack.UnpackException):
+        logger.error(f"Error decoding message: {payload}")
     except Exception as e:
         logger.error(f"Error processing message: {e}")
+    
+    return None
 
-def store_message(data, receive_time, latency):
-    """Store message in SQLite database with optimized schema"""
-    global db_connection, db_cursor
+def pack_readings(readings):
+    """Pack an {"angle_<deg>": distance} dict into a single float32 BLOB"""
+    global readings_scratch
     
+    # Parse only "angle_<deg>" keys, so one odd key doesn't drop the whole message
+    angle_keys = [key for key in readings if isinstance(key, str) and ANGLE_KEY_PATTERN.fullmatch(key)]
+    if len(angle_keys) < len(readings):
+        logger.warning(f"Skipping {len(readings) - len(angle_keys)} readings keys without an angle")
+    
+    # Reuse the scratch array, growing it only for unusually large scans
+    count = len(angle_keys)
+    if count > len(readings_scratch):
+        readings_scratch = np.empty((count, 2), dtype=READINGS_DTYPE)
+    packed = readings_scratch[:count]
+    
+    # Fill the columns straight from generators, without building a list of tuples
+    packed[:, 0] = np.fromiter(
+        (float(key[6:]) for key in angle_keys),
+        dtype=READINGS_DTYPE, count=count
+    )
+    packed[:, 1] = np.fromiter((readings[key] for key in angle_keys), dtype=READINGS_DTYPE, count=count)
+    return packed.tobytes()
+
+def pack_scan(scan):
+    """Pack a raw scan (float32 distance per whole degree, 0 = no return) into a readings BLOB"""
+    distances = np.frombuffer(scan, dtype=READINGS_DTYPE)
+    angles = np.flatnonzero(distances)
+    
+    packed = np.empty((len(angles), 2), dtype=READINGS_DTYPE)
+    packed[:, 0] = angles
+    packed[:, 1] = distances[angles]
+    return packed.tobytes()
+
+def message_row(data, receive_time, latency):
+    """Build the sensor_data row for a message with optimized schema"""
     timestamp = data.get("timestamp", time.time())
     message_id = data.get("message_id", -1)
     device_id = data.get("device_id", "unknown")
     
+    # Reject fields SQLite can't store in their columns, so a bad message is
+    # dropped on its own instead of failing the batch it was written with
     try:
-        # Insert main record
-        db_cursor.execute('''
-        INSERT INTO sensor_data 
-        (timestamp, receive_time, message_id, device_id, latency_ms)
-        VALUES (?, ?, ?, ?, ?)
-        ''', (timestamp, receive_time, message_id, device_id, latency))
-        
-        # Get the ID of the inserted record
-        data_id = db_cursor.lastrowid
-        
-        # Store readings if available
-        if "readings" in data and isinstance(data["readings"], dict):
-            readings = data["readings"]
-            reading_data = []
-            
-            for angle, value in readings.items():
-                reading_data.append((data_id, angle, value))
-            
-            # Batch insert for better performance
-            db_cursor.executemany('''
-            INSERT INTO sensor_readings (data_id, angle, value)
-            VALUES (?, ?, ?)
-            ''', reading_data)
-        
-        # Commit every 100 messages for balance of performance and safety
-        if message_counts % 100 == 0:
-            db_connection.commit()
-            
-    except sqlite3.Error as e:
-        logger.error(f"Database error: {e}")
-        # Try to commit what we can
-        db_connection.commit()
+        timestamp = float(timestamp)
+    except (TypeError, ValueError, OverflowError):
+        logger.warning(f"Dropping message with invalid timestamp: {timestamp!r}")
+        return None
+    if message_id is not None and not (isinstance(message_id, int) and SQLITE_INT_MIN <= message_id <= SQLITE_INT_MAX):
+        logger.warning(f"Dropping message with invalid message_id: {message_id!r}")
+        return None
+    if not isinstance(device_id, str):
+        logger.warning(f"Dropping message with invalid device_id: {device_id!r}")
+        return None
+    
+    # Pack readings into one row instead of one row per angle
+    readings_blob = None
+    readings_format = None
+    if "readings" in data and isinstance(data["readings"], dict):
+        readings_blob = pack_readings(data["readings"])
+        readings_format = READINGS_FORMAT
+    elif isinstance(data.get("scan"), bytes):
+        readings_blob = pack_scan(data["scan"])
+        readings_format = READINGS_FORMAT
+    
+    # Main record along with its packed readings
+    return (timestamp, receive_time, message_id, device_id, latency, readings_blob, readings_format)
 
 def report_statistics():
     """Report performance statistics"""
@@ -236,12 +547,18 @@ def report_statistics():
     logger.info("\n--- Communication Statistics ---")
     logger.info(f"Messages received: {message_counts}")
     logger.info(f"Average throughput: {throughput:.2f} msg/sec")
+    if dropped_messages:
+        logger.info(f"Messages dropped (queue full): {dropped_messages}")
+    
+    # Latency statistics over the most recent LATENCY_WINDOW messages
+    latency_array = np.fromiter(latencies, dtype=np.float64, count=len(latencies))
+    avg_latency = float(latency_array.mean())
+    min_latency = float(latency_array.min())
+    max_latency = float(latency_array.max())
     
-    # Latency statistics
-    avg_latency = statistics.mean(latencies)
-    min_latency = min(latencies)
-    max_latency = max(latencies)
-    p95_latency = sorted(latencies)[int(len(latencies) * 0.95)]
+    # np.partition selects the p95 element in O(N) instead of sorting the window
+    p95_index = int(len(latency_array) * 0.95)
+    p95_latency = float(np.partition(latency_array, p95_index)[p95_index])
     
     logger.info(f"Latency (ms) - Avg: {avg_latency:.2f}, Min: {min_latency:.2f}, Max: {max_latency:.2f}, p95: {p95_latency:.2f}")
     logger.info("-------------------------------")
@@ -268,13 +585,12 @@ def save_statistics_snapshot(avg_latency, min_latency, max_latency, p95_latency,
         ''')
         
         # Insert stats
-        db_cursor.execute('''
-        INSERT INTO performance_stats
-        (timestamp, message_count, avg_latency, min_latency, max_latency, p95_latency, throughput)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (time.time(), message_counts, avg_latency, min_latency, max_latency, p95_latency, throughput))
+        db_cursor.execute(
+            SQL_INSERT_PERFORMANCE_STATS,
+            (time.time(), message_counts, avg_latency, min_latency, max_latency, p95_latency, throughput)
+        )
         
-        db_connection.commit()
+        # No commit needed: outside a batch the connection is in autocommit mode
         logger.info("Performance statistics snapshot saved to database")
     except sqlite3.Error as e:
         logger.error(f"Error saving performance stats: {e}")
@@ -282,12 +598,16 @@ def save_statistics_snapshot(avg_latency, min_latency, max_latency, p95_latency,
 def handle_exit(sig, frame):
     """Handle clean shutdown on exit signals"""
     logger.info("Shutting down receiver...")
+    stop_writer()  # Store everything still queued
+    stop_checkpointer()
     report_statistics()  # Final report
     close_database()
     sys.exit(0)
 
 def main():
     """Main function to run the receiver"""
+    global writer_thread, checkpoint_thread
+    
     # Set up signal handlers for graceful shutdown
     signal.signal(signal.SIGINT, handle_exit)
     signal.signal(signal.SIGTERM, handle_exit)
@@ -297,6 +617,16 @@ def main():
         db_path = setup_database()
         logger.info(f"Using database: {db_path}")
         
+        # Start the writer thread that owns all database writes
+        writer_thread = threading.Thread(target=db_writer, name="db-writer")
+        writer_thread.daemon = True
+        writer_thread.start()
+        
+        # Checkpoint the WAL in the background; wal_autocheckpoint = 10000 stays on as a backstop
+        checkpoint_thread = threading.Thread(target=wal_checkpointer, args=(db_path,), name="wal-checkpoint")
+        checkpoint_thread.daemon = True
+        checkpoint_thread.start()
+        
         # Set up MQTT client
         client = mqtt.Client()
         client.on_connect = on_connect
@@ -330,6 +660,8 @@ def main():
     except Exception as e:
         logger.error(f"Error in main: {e}")
     finally:
+        stop_writer()
+        stop_checkpointer()
         close_database()
     
     return 0
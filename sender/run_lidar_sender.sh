@@ -108,12 +108,13 @@ This is a modified version of lidar_integration.py that simulates lidar data.
 """
 import paho.mqtt.client as mqtt
 import time
-import json
+import msgpack
 import os
 import logging
 import threading
 import random
 import math
+import numpy as np
 
 # Configure logging
 logging.basicConfig(
@@ -129,15 +130,24 @@ TOPIC = os.environ.get("TOPIC", "sensor/test")
 DEVICE_ID = os.environ.get("DEVICE_ID", "raspi_lidar")
 PUBLISH_RATE = float(os.environ.get("PUBLISH_RATE", 5.0))  # Hz
 
+# Wire format version, sent as the first payload byte
+PAYLOAD_VERSION = 1
+
+# Scan buffers hold one distance slot per whole degree
+SCAN_SIZE = 360
+SCAN_DTYPE = np.dtype('<f4')  # Sent as-is in the "scan" field, so fixed little-endian
+
 # Global variables
-latest_scan = {}
-scan_lock = threading.Lock()
+# The simulation thread fills scan_buffer (which only it touches) and then
+# publishes an immutable bytes snapshot with a single reference store, so the
+# publisher always sends a complete scan without a lock
+scan_buffer = np.zeros(SCAN_SIZE, dtype=SCAN_DTYPE)
+latest_scan = None
 running = True
 
-def generate_simulated_scan():
-    """Generate simulated lidar scan data"""
+def generate_simulated_scan(scan_buffer):
+    """Fill a scan buffer with simulated lidar scan data"""
     # Simulate a rotating object at a fixed distance with some noise
-    scan_data = {}
     base_distance = 100.0  # cm
     
     for angle in range(0, 360, 1):  # 1-degree resolution
@@ -157,10 +167,7 @@ def generate_simulated_scan():
             # Wall in front
             distance = 200.0 + random.uniform(-2, 2)
             
-        angle_key = f"angle_{angle}"
-        scan_data[angle_key] = distance
-    
-    return scan_data
+        scan_buffer[angle] = distance
 
 def lidar_simulation_thread():
     """Thread function to continuously generate simulated lidar data"""
@@ -169,59 +176,65 @@ def lidar_simulation_thread():
     logger.info("Starting lidar simulation")
     
     while running:
-        # Generate simulated scan data
-        scan_data = generate_simulated_scan()
+        # Generate simulated scan data into the buffer
+        generate_simulated_scan(scan_buffer)
         
-        # Update the latest scan with thread safety
-        with scan_lock:
-            latest_scan = scan_data.copy()
+        # Hand a snapshot of the completed scan to the publisher
+        latest_scan = scan_buffer.tobytes()
         
         # Simulate the scan rate of a real lidar (10Hz)
         time.sleep(0.1)
     
     logger.info("Lidar simulation thread stopped")
 
+def encode_payload(data):
+    """Encode a message as a version byte followed by a MessagePack map"""
+    # The scan is already raw float32 bytes, so the map itself keeps
+    # double precision for the timestamps
+    return bytes([PAYLOAD_VERSION]) + msgpack.packb(data)
+
 def publish_thread(client):
     """Thread function to publish lidar data at a consistent rate"""
-    global latest_scan, running
+    global running
     
     logger.info(f"Starting publisher thread (rate: {PUBLISH_RATE} Hz)")
     
     message_id = 0
-    period = 1.0 / PUBLISH_RATE
+    period_ns = int(1e9 / PUBLISH_RATE)
     
     while running:
-        start_time = time.time()
+        deadline = time.monotonic_ns() + period_ns
         
-        # Get a copy of the latest scan with thread safety
-        with scan_lock:
-            scan_data = latest_scan.copy()
-        
-        # Only publish if we have data
-        if scan_data:
+        # Only publish once the simulation has completed a scan
+        if latest_scan is not None:
+            # Send the latest snapshot as raw bytes: one float32 distance per
+            # degree, 0 where there was no return. Read the reference once; the
+            # bytes object itself never changes
+            scan_bytes = latest_scan
+            
             # Prepare message payload
             data = {
                 "timestamp": time.time(),
                 "device_id": DEVICE_ID,
                 "message_id": message_id,
                 "send_time": time.time(),
-                "readings": scan_data
+                "scan": scan_bytes
             }
             
             # Publish
-            payload = json.dumps(data)
+            payload = encode_payload(data)
             client.publish(TOPIC, payload)
             
             # Log occasionally
             if message_id % 50 == 0:
-                logger.info(f"Published message {message_id} with {len(scan_data)} readings")
+                logger.info(f"Published message {message_id} with {np.count_nonzero(np.frombuffer(scan_bytes, dtype=SCAN_DTYPE))} readings")
             
             message_id += 1
         
         # Sleep to maintain consistent publishing rate
-        elapsed = time.time() - start_time
-        sleep_time = max(0, period - elapsed)
-        time.sleep(sleep_time)
+        sleep_ns = deadline - time.monotonic_ns()
+        if sleep_ns > 0:
+            time.sleep(sleep_ns / 1e9)
 
 def main():
     """Main function"""
@@ -5,10 +5,10 @@ Simulates lidar data transmission for testing message broker setup.
 """
 import paho.mqtt.client as mqtt
 import time
-import json
-import random
+import msgpack
 import os
 import logging
+import numpy as np
 
 # Configure logging
 logging.basicConfig(
@@ -22,17 +22,23 @@ BROKER_ADDRESS = os.environ.get("BROKER_ADDRESS", "mqtt-broker")
 PORT = int(os.environ.get("BROKER_PORT", 1883))
 TOPIC = os.environ.get("TOPIC", "sensor/test")
 INTERVAL = float(os.environ.get("INTERVAL", 0.1))  # 10 messages per second
+INTERVAL_NS = int(INTERVAL * 1e9)
 MESSAGE_COUNT = int(os.environ.get("MESSAGE_COUNT", 1000))
 DEVICE_ID = os.environ.get("DEVICE_ID", "raspi_test")
 
+# Angle keys for the simulated readings, every 10 degrees
+ANGLES = [f"angle_{i}" for i in range(0, 360, 10)]
+
+# Wire format version, sent as the first payload byte
+PAYLOAD_VERSION = 1
+
 def generate_test_data():
     """Generate dummy data that simulates lidar-like readings"""
     timestamp = time.time()
-    # Simulate distance readings (in cm) at different angles
-    readings = {
-        f"angle_{i}": round(random.uniform(10, 500), 2)  # Distance in cm
-        for i in range(0, 360, 10)  # Every 10 degrees
-    }
+    # Simulate distance readings (in cm) at different angles,
+    # drawing all of them in a single vectorized call
+    distances = np.round(np.random.uniform(10, 500, size=len(ANGLES)), 2).tolist()
+    readings = dict(zip(ANGLES, distances))
     
     data = {
         "timestamp": timestamp,
@@ -41,6 +47,14 @@ def generate_test_data():
     }
     return data
 
+def encode_payload(data):
+    """Encode a message as a version byte followed by a MessagePack map"""
+    # Readings are packed on their own with single-precision floats; the
+    # timestamps in the outer map need double precision
+    message = dict(data)
+    message["readings"] = msgpack.packb(data["readings"], use_single_float=True)
+    return bytes([PAYLOAD_VERSION]) + msgpack.packb(message)
+
 def main():
     """Main function to run the sender"""
     # Connect to broker
@@ -69,29 +83,33 @@ def main():
     logger.info(f"Starting to publish {MESSAGE_COUNT} test messages to {BROKER_ADDRESS}:{PORT}")
     logger.info(f"Publishing to topic: {TOPIC}")
 
-    # Track start time for performance measurement
-    start_time = time.time()
+    # Track start time for performance measurement (monotonic, immune to clock jumps)
+    start_ns = time.monotonic_ns()
     
     try:
         # Send test messages
         for message_id in range(MESSAGE_COUNT):
+            deadline = time.monotonic_ns() + INTERVAL_NS
             data = generate_test_data()
             data["message_id"] = message_id
             
             # Add a timestamp just before sending
             data["send_time"] = time.time()
             
-            payload = json.dumps(data)
+            payload = encode_payload(data)
             client.publish(TOPIC, payload)
             
             # Print progress every 100 messages
             if message_id % 100 == 0:
                 logger.info(f"Published message {message_id}")
             
-            time.sleep(INTERVAL)
+            # Sleep only for what is left of the interval
+            sleep_ns = deadline - time.monotonic_ns()
+            if sleep_ns > 0:
+                time.sleep(sleep_ns / 1e9)
             
         # Calculate and log performance metrics
-        elapsed_time = time.time() - start_time
+        elapsed_time = (time.monotonic_ns() - start_ns) / 1e9
         actual_rate = MESSAGE_COUNT / elapsed_time
         logger.info(f"Test publishing complete! {MESSAGE_COUNT} messages in {elapsed_time:.2f} seconds")
         logger.info(f"Actual publish rate: {actual_rate:.2f} messages/second")
@@ -4,12 +4,27 @@ SQLite Database Analyzer for Sensor Data
 Utility script to analyze and extract insights from the stored sensor data.
 """
 import sqlite3
+import csv
 import pandas as pd
 import argparse
 import os
 import matplotlib.pyplot as plt
 import numpy as np
 from datetime import datetime
+from sqlite_helper import has_packed_readings
+
+# Packed readings layout written by the receiver into sensor_data.readings_blob
+READINGS_FORMAT = "float32:angle,distance"
+READINGS_DTYPE = np.dtype('<f4')
+
+# Latency trends are aggregated per time bucket in SQLite before plotting
+LATENCY_BUCKET_SECONDS = 60
+
+# Write buffer for streamed CSV exports
+CSV_BUFFER_SIZE = 1 << 20
+
+# Prefix of the angle keys in the legacy sensor_readings table (e.g. 'angle_90')
+ANGLE_PREFIX = "angle_"
 
 def connect_to_db(db_path):
     """Connect to the SQLite database"""
@@ -76,26 +91,31 @@ def get_summary_stats(conn):
 
 def analyze_latency_trends(conn, output_path=None):
     """Analyze latency trends over time"""
-    # Get latency data
+    # Aggregate latency per time bucket in SQLite rather than loading every row
     query = """
-    SELECT timestamp, latency_ms 
+    SELECT CAST(timestamp / ? AS INTEGER) * ? AS bucket,
+        AVG(latency_ms) AS avg_latency,
+        MIN(latency_ms) AS min_latency,
+        MAX(latency_ms) AS max_latency,
+        COUNT(*) AS message_count
     FROM sensor_data 
     WHERE latency_ms IS NOT NULL
-    ORDER BY timestamp
+    GROUP BY bucket
+    ORDER BY bucket
     """
     
-    df = pd.read_sql_query(query, conn)
-    
-    # Convert timestamp to datetime
-    df['datetime'] = pd.to_datetime(df['timestamp'], unit='s')
+    df = pd.read_sql_query(query, conn, params=(LATENCY_BUCKET_SECONDS, LATENCY_BUCKET_SECONDS))
+    if df.empty:
+        print("No latency data found")
+        return df
     
-    # Calculate rolling average
-    df['rolling_avg'] = df['latency_ms'].rolling(window=50).mean()
+    # Convert bucket start to datetime
+    df['datetime'] = pd.to_datetime(df['bucket'], unit='s')
     
     # Plot
     plt.figure(figsize=(12, 6))
-    plt.plot(df['datetime'], df['latency_ms'], 'b.', alpha=0.3, label='Raw latency')
-    plt.plot(df['datetime'], df['rolling_avg'], 'r-', linewidth=2, label='50-point rolling average')
+    plt.fill_between(df['datetime'], df['min_latency'], df['max_latency'], color='b', alpha=0.2, label='Min/max latency')
+    plt.plot(df['datetime'], df['avg_latency'], 'r-', linewidth=2, label=f'{LATENCY_BUCKET_SECONDS}s average')
     
     plt.title('Latency Over Time')
     plt.xlabel('Time')
@@ -109,44 +129,99 @@ def analyze_latency_trends(conn, output_path=None):
     else:
         plt.show()
     
+    # Percentiles need the raw values, so read just the latency column in one call
+    latencies = pd.read_sql_query(
+        "SELECT latency_ms FROM sensor_data WHERE latency_ms IS NOT NULL", conn
+    )['latency_ms']
+    if latencies.empty:
+        print("No latency data found")
+        return df
+    
     # Calculate additional statistics
-    latency_stats = df['latency_ms'].describe(percentiles=[0.5, 0.95, 0.99])
+    latency_stats = latencies.describe(percentiles=[0.5, 0.95, 0.99])
     print("\n=== Latency Statistics ===")
     print(latency_stats)
     
     return df
 
-def analyze_sensor_readings(conn, output_path=None):
-    """Analyze sensor readings from the database"""
-    # Check if there are sensor readings in the database
+def load_packed_readings(conn, limit=1000):
+    """Decode the packed readings of the most recent messages into a DataFrame"""
+    if not has_packed_readings(conn):
+        return None
+    
+    query = """
+    SELECT timestamp, readings_blob
+    FROM sensor_data
+    WHERE readings_format = ?
+    ORDER BY timestamp DESC
+    """
+    
+    # Walk back from the newest message until we have enough readings
+    frames = []
+    total = 0
+    for timestamp, blob in conn.execute(query, (READINGS_FORMAT,)):
+        readings = np.frombuffer(blob, dtype=READINGS_DTYPE).reshape(-1, 2)
+        frames.append(pd.DataFrame({
+            'timestamp': timestamp,
+            'angle_value': readings[:, 0],
+            'value': readings[:, 1]
+        }))
+        total += len(readings)
+        if total >= limit:
+            break
+    
+    if not frames:
+        return None
+    
+    return pd.concat(frames, ignore_index=True)
+
+def load_legacy_readings(conn, limit=1000):
+    """Load the most recent readings from the legacy sensor_readings table"""
     cursor = conn.cursor()
     cursor.execute("SELECT COUNT(*) FROM sensor_readings")
     count = cursor.fetchone()[0]
     
     if count == 0:
-        print("No sensor readings found in the database")
         return None
     
-    # Get some sample readings to analyze
-    # Limit to last 1000 readings for performance
     query = """
     SELECT s.timestamp, r.angle, r.value
     FROM sensor_readings r
     JOIN sensor_data s ON r.data_id = s.id
     ORDER BY s.timestamp DESC
-    LIMIT 1000
+    LIMIT ?
     """
     
-    df = pd.read_sql_query(query, conn)
+    df = pd.read_sql_query(query, conn, params=(limit,))
     
     # Convert angle strings to numeric if possible
     if 'angle' in df.columns:
         try:
-            # Extract numeric part if angle is in format like 'angle_90'
-            df['angle_value'] = df['angle'].str.extract(r'(\d+)').astype(float)
+            # Angles are stored as 'angle_<deg>', so slicing off the fixed
+            # prefix is enough and avoids running a regex per row
+            prefix_len = len(ANGLE_PREFIX)
+            df['angle_value'] = np.fromiter(
+                (float(angle[prefix_len:]) for angle in df['angle'].values),
+                dtype=np.float64,
+                count=len(df)
+            )
         except:
             print("Could not convert angles to numeric values")
     
+    return df
+
+def analyze_sensor_readings(conn, output_path=None):
+    """Analyze sensor readings from the database"""
+    # Limit to the last 1000 readings for performance, preferring the packed
+    # per-message readings and falling back to the legacy table
+    df = load_packed_readings(conn, limit=1000)
+    if df is None:
+        df = load_legacy_readings(conn, limit=1000)
+    
+    if df is None:
+        print("No sensor readings found in the database")
+        return None
+    
     # If we have angle_value, we can create a polar plot for the latest reading
     if 'angle_value' in df.columns:
         # Get the latest timestamp
@@ -181,30 +256,40 @@ def analyze_sensor_readings(conn, output_path=None):
     
     return df
 
+def write_query_to_csv(conn, query, csv_path):
+    """Stream the rows of a query straight into a CSV file"""
+    # Run the query first so a failing query doesn't leave an empty file behind
+    cursor = conn.execute(query)
+    
+    with open(csv_path, 'w', newline='', buffering=CSV_BUFFER_SIZE) as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(column[0] for column in cursor.description)
+        writer.writerows(cursor)
+
 def export_to_csv(conn, output_path):
     """Export data to CSV files"""
     if not os.path.exists(output_path):
         os.makedirs(output_path)
     
     # Export main sensor data
+    # The packed readings BLOB is left out, it isn't meaningful as CSV text
     sensor_data_query = """
-    SELECT * FROM sensor_data
+    SELECT id, timestamp, receive_time, message_id, device_id, latency_ms
+    FROM sensor_data
     ORDER BY timestamp
     """
     
-    sensor_df = pd.read_sql_query(sensor_data_query, conn)
     sensor_csv_path = os.path.join(output_path, 'sensor_data.csv')
-    sensor_df.to_csv(sensor_csv_path, index=False)
+    write_query_to_csv(conn, sensor_data_query, sensor_csv_path)
     print(f"Sensor data exported to {sensor_csv_path}")
     
     # Export performance stats if they exist
     try:
         stats_query = "SELECT * FROM performance_stats ORDER BY timestamp"
-        stats_df = pd.read_sql_query(stats_query, conn)
         stats_csv_path = os.path.join(output_path, 'performance_stats.csv')
-        stats_df.to_csv(stats_csv_path, index=False)
+        write_query_to_csv(conn, stats_query, stats_csv_path)
         print(f"Performance stats exported to {stats_csv_path}")
-    except:
+    except sqlite3.Error:
         print("No performance stats table found")
     
     return True
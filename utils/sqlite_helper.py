@@ -4,10 +4,12 @@ SQLite Helper Utility
 Provides helper functions for working with the sensor data SQLite database.
 """
 import sqlite3
+import csv
 import os
-import pandas as pd
+import numpy as np
 import logging
 import argparse
+import itertools
 from datetime import datetime, timedelta
 
 logging.basicConfig(
@@ -16,7 +18,46 @@ logging.basicConfig(
 )
 logger = logging.getLogger('sqlite-helper')
 
-def connect_to_db(db_path):
+# Packed readings layout written by the receiver into sensor_data.readings_blob
+READINGS_FORMAT = "float32:angle,distance"
+READINGS_DTYPE = np.dtype('<f4')
+
+# sensor_data columns exported to CSV (the packed readings are exported separately)
+SENSOR_DATA_COLUMNS = "id, timestamp, receive_time, message_id, device_id, latency_ms"
+
+# Connection tuning for the large read/sort workloads of check, export and rebuild
+CACHE_SIZE_KIB = 262144  # 256 MiB page cache
+MMAP_SIZE = 268435456  # 256 MiB memory map, lower it on small machines
+BUSY_TIMEOUT_MS = 30000  # Wait for the receiver's write transactions instead of failing
+
+# Settings for connections that write (journal_mode is a property of the file)
+WRITER_PRAGMAS = """
+-- WAL mode for better concurrency and performance
+PRAGMA journal_mode = WAL;
+-- NORMAL sync is still safe for most use cases in WAL mode
+PRAGMA synchronous = NORMAL;
+"""
+
+# Settings applied to every connection
+CONNECTION_PRAGMAS = """
+-- Foreign keys for data integrity (and cascading prunes)
+PRAGMA foreign_keys = ON;
+-- Sort and temp data for exports stays in memory instead of temp files
+PRAGMA temp_store = MEMORY;
+-- Larger page cache (negative value is in KiB) and memory-mapped reads
+PRAGMA cache_size = -{cache_size_kib};
+PRAGMA mmap_size = {mmap_size};
+-- Wait on locks held by the receiver rather than failing immediately
+PRAGMA busy_timeout = {busy_timeout_ms};
+"""
+
+# Rows fetched and written per batch when streaming CSV exports
+EXPORT_CHUNK_SIZE = 50000
+
+# Messages deleted per transaction when pruning
+PRUNE_BATCH_SIZE = 10000
+
+def connect_to_db(db_path, mmap_size=MMAP_SIZE):
     """Connect to the SQLite database with optimal settings"""
     if not os.path.exists(db_path):
         logger.error(f"Database file not found: {db_path}")
@@ -26,18 +67,20 @@ def connect_to_db(db_path):
         # Connect with optimized settings
         conn = sqlite3.connect(db_path)
         
-        # Enable WAL mode for better concurrency and performance
-        conn.execute("PRAGMA journal_mode = WAL")
+        # Use a larger page size for better performance with larger datasets.
+        # This only takes effect while the database is still empty
+        if conn.execute("PRAGMA page_count").fetchone()[0] == 0:
+            conn.execute("PRAGMA page_size = 4096")
         
-        # Set synchronous mode to NORMAL for better performance
-        # (still safe for most use cases)
-        conn.execute("PRAGMA synchronous = NORMAL")
+        # Apply the connection settings in one script instead of one call each
+        conn.executescript(WRITER_PRAGMAS + CONNECTION_PRAGMAS.format(
+            cache_size_kib=CACHE_SIZE_KIB, mmap_size=int(mmap_size), busy_timeout_ms=BUSY_TIMEOUT_MS
+        ))
         
-        # Use a larger page size for better performance with larger datasets
-        conn.execute("PRAGMA page_size = 4096")
-        
-        # Enable foreign keys for data integrity
-        conn.execute("PRAGMA foreign_keys = ON")
+        # journal_mode can silently stay unchanged (e.g. on a read-only filesystem)
+        journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        if journal_mode.lower() != "wal":
+            logger.warning(f"WAL mode not enabled, journal_mode is '{journal_mode}'")
         
         logger.info(f"Connected to database: {db_path}")
         return conn
@@ -45,21 +88,25 @@ def connect_to_db(db_path):
         logger.error(f"Error connecting to database: {e}")
         return None
 
-def check_db_health(conn):
+def has_packed_readings(conn):
+    """Check whether sensor_data has the packed readings columns"""
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(sensor_data)")
+    return any(row[1] == 'readings_blob' for row in cursor.fetchall())
+
+def check_db_health(conn, deep=False):
     """Check database health and size"""
     try:
         cursor = conn.cursor()
         
-        # Run integrity check
-        cursor.execute("PRAGMA integrity_check")
+        # quick_check skips the index cross-checks of integrity_check; both stop
+        # at the first problem found
+        cursor.execute("PRAGMA integrity_check(1)" if deep else "PRAGMA quick_check(1)")
         integrity = cursor.fetchone()[0]
         
         # Get database size
-        cursor.execute("PRAGMA page_count")
-        page_count = cursor.fetchone()[0]
-        cursor.execute("PRAGMA page_size")
-        page_size = cursor.fetchone()[0]
-        db_size_mb = (page_count * page_size) / (1024 * 1024)
+        cursor.execute("SELECT page_count * page_size FROM pragma_page_count(), pragma_page_size()")
+        db_size_mb = cursor.fetchone()[0] / (1024 * 1024)
         
         # Get table row counts
         cursor.execute("SELECT COUNT(*) FROM sensor_data")
@@ -69,11 +116,15 @@ def check_db_health(conn):
         sensor_readings_count = cursor.fetchone()[0]
         
         print("\n=== Database Health Check ===")
-        print(f"Integrity check: {integrity}")
+        print(f"{'Integrity' if deep else 'Quick'} check: {integrity}")
         print(f"Database size: {db_size_mb:.2f} MB")
         print(f"sensor_data rows: {sensor_data_count}")
         print(f"sensor_readings rows: {sensor_readings_count}")
         
+        if has_packed_readings(conn):
+            cursor.execute("SELECT COUNT(*) FROM sensor_data WHERE readings_blob IS NOT NULL")
+            print(f"Messages with packed readings: {cursor.fetchone()[0]}")
+        
         if sensor_data_count > 0:
             # Get oldest and newest records
             cursor.execute("SELECT MIN(timestamp), MAX(timestamp) FROM sensor_data")
@@ -111,6 +162,11 @@ def optimize_database(conn):
         logger.error(f"Error optimizing database: {e}")
         return False
 
+def has_cascading_readings(conn):
+    """Check whether deleting from sensor_data cascades to sensor_readings"""
+    cursor = conn.execute("PRAGMA foreign_key_list(sensor_readings)")
+    return any(row[2] == 'sensor_data' and row[6] == 'CASCADE' for row in cursor.fetchall())
+
 def prune_old_data(conn, days_to_keep=30):
     """Delete data older than the specified number of days"""
     try:
@@ -135,25 +191,36 @@ def prune_old_data(conn, days_to_keep=30):
             print("Pruning cancelled")
             return False
         
-        # Begin transaction
-        conn.execute("BEGIN TRANSACTION")
-        
-        # Delete from sensor_readings first (foreign key constraint)
-        cursor.execute("""
-        DELETE FROM sensor_readings
-        WHERE data_id IN (
-            SELECT id FROM sensor_data
-            WHERE timestamp < ?
-        )
-        """, (cutoff_unix,))
-        readings_deleted = cursor.rowcount
+        # Newer schemas delete readings through ON DELETE CASCADE
+        cascade = has_cascading_readings(conn)
         
-        # Then delete from sensor_data
-        cursor.execute("DELETE FROM sensor_data WHERE timestamp < ?", (cutoff_unix,))
-        data_deleted = cursor.rowcount
+        # The oldest PRUNE_BATCH_SIZE messages past the cutoff
+        batch_ids = "SELECT id FROM sensor_data WHERE timestamp < ? ORDER BY timestamp, id LIMIT ?"
+        batch_params = (cutoff_unix, PRUNE_BATCH_SIZE)
         
-        # Commit changes
-        conn.commit()
+        # Delete in batches, each in its own transaction, to keep the WAL bounded
+        data_deleted = 0
+        readings_deleted = 0
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            changes_before = conn.total_changes
+            
+            if not cascade:
+                # Delete from sensor_readings first (foreign key constraint)
+                cursor.execute(f"DELETE FROM sensor_readings WHERE data_id IN ({batch_ids})", batch_params)
+            
+            cursor.execute(f"DELETE FROM sensor_data WHERE id IN ({batch_ids})", batch_params)
+            batch_deleted = cursor.rowcount
+            
+            # total_changes also counts rows removed by the cascade
+            readings_deleted += conn.total_changes - changes_before - batch_deleted
+            data_deleted += batch_deleted
+            
+            # Commit changes
+            conn.commit()
+            
+            if batch_deleted < PRUNE_BATCH_SIZE:
+                break
         
         print(f"Pruned {data_deleted} records from sensor_data")
         print(f"Pruned {readings_deleted} records from sensor_readings")
@@ -164,6 +231,44 @@ def prune_old_data(conn, days_to_keep=30):
         conn.rollback()
         return False
 
+def write_rows_to_csv(header, row_batches, csv_path):
+    """Write batches of row tuples to one CSV file and return the number of rows written"""
+    row_count = 0
+    with open(csv_path, 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(header)
+        for rows in row_batches:
+            writer.writerows(rows)
+            row_count += len(rows)
+            logger.debug(f"Wrote {row_count} rows to {csv_path}")
+    return row_count
+
+def iter_fetch_batches(cursor, batch_size=EXPORT_CHUNK_SIZE):
+    """Yield the remaining rows of an executed cursor in batches"""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        yield rows
+
+def iter_packed_readings(conn, query, params, batch_size=EXPORT_CHUNK_SIZE):
+    """Expand packed readings into batches of (data_id, angle, value, timestamp) rows"""
+    rows = []
+    for data_id, data_timestamp, blob in conn.execute(query, params):
+        readings = np.frombuffer(blob, dtype=READINGS_DTYPE).reshape(-1, 2)
+        # %.7g keeps the float32 precision without widening to float64 digits
+        rows.extend(
+            (data_id, f"angle_{angle:g}", f"{value:.7g}", data_timestamp)
+            for angle, value in readings.tolist()
+        )
+        
+        if len(rows) >= batch_size:
+            yield rows
+            rows = []
+    
+    if rows:
+        yield rows
+
 def export_data_to_csv(conn, output_dir, time_range=None):
     """Export data to CSV files with optional time filtering"""
     if not os.path.exists(output_dir):
@@ -179,81 +284,120 @@ def export_data_to_csv(conn, output_dir, time_range=None):
             query_filter = " WHERE timestamp >= ? AND timestamp <= ?"
             params = (start_time.timestamp(), end_time.timestamp())
         
-        # Export sensor_data
-        sensor_data_query = f"SELECT * FROM sensor_data{query_filter} ORDER BY timestamp"
-        sensor_data_df = pd.read_sql_query(sensor_data_query, conn, params=params)
+        # Export sensor_data, converting Unix timestamps to readable UTC datetimes in SQL
+        sensor_data_query = f"""
+        SELECT {SENSOR_DATA_COLUMNS},
+            strftime('%Y-%m-%d %H:%M:%f', timestamp, 'unixepoch') AS timestamp_readable,
+            strftime('%Y-%m-%d %H:%M:%f', receive_time, 'unixepoch') AS receive_time_readable
+        FROM sensor_data{query_filter}
+        ORDER BY timestamp
+        """
         
-        # Convert Unix timestamps to datetime for readability
-        if 'timestamp' in sensor_data_df.columns:
-            sensor_data_df['timestamp_readable'] = pd.to_datetime(sensor_data_df['timestamp'], unit='s')
-        if 'receive_time' in sensor_data_df.columns:
-            sensor_data_df['receive_time_readable'] = pd.to_datetime(sensor_data_df['receive_time'], unit='s')
+        # Stream rows from the cursor straight to CSV
+        cursor = conn.cursor()
+        cursor.arraysize = EXPORT_CHUNK_SIZE
+        cursor.execute(sensor_data_query, params)
+        header = [column[0] for column in cursor.description]
         
-        # Save to CSV
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         sensor_data_path = os.path.join(output_dir, f"sensor_data_{timestamp}.csv")
-        sensor_data_df.to_csv(sensor_data_path, index=False)
-        print(f"Exported {len(sensor_data_df)} records to {sensor_data_path}")
+        sensor_data_count = write_rows_to_csv(header, iter_fetch_batches(cursor), sensor_data_path)
+        print(f"Exported {sensor_data_count} records to {sensor_data_path}")
         
         # Export sensor_readings if there's data to export
-        if len(sensor_data_df) > 0:
+        if sensor_data_count > 0:
             # For readings, we need to join with sensor_data to apply the time filter
             readings_query = """
-            SELECT r.*, s.timestamp
+            SELECT r.data_id, r.angle, r.value, s.timestamp
             FROM sensor_readings r
             JOIN sensor_data s ON r.data_id = s.id
             """
             
             if time_range:
                 readings_query += " WHERE s.timestamp >= ? AND s.timestamp <= ?"
+            
+            # Ordering by data_id follows the sensor_readings key/index, so
+            # SQLite streams rows instead of sorting the whole join first
+            readings_query += " ORDER BY r.data_id"
+            
+            cursor.execute(readings_query, params)
+            readings_batches = [iter_fetch_batches(cursor)]
+            
+            # Expand packed readings into the same (data_id, angle, value, timestamp) rows
+            if has_packed_readings(conn):
+                packed_query = "SELECT id, timestamp, readings_blob FROM sensor_data WHERE readings_format = ?"
+                if time_range:
+                    packed_query += " AND timestamp >= ? AND timestamp <= ?"
+                packed_query += " ORDER BY id"
                 
-            readings_query += " ORDER BY s.timestamp, r.data_id"
+                readings_batches.append(iter_packed_readings(conn, packed_query, (READINGS_FORMAT,) + params))
             
-            readings_df = pd.read_sql_query(readings_query, conn, params=params)
             readings_path = os.path.join(output_dir, f"sensor_readings_{timestamp}.csv")
-            readings_df.to_csv(readings_path, index=False)
-            print(f"Exported {len(readings_df)} records to {readings_path}")
+            readings_count = write_rows_to_csv(
+                ['data_id', 'angle', 'value', 'timestamp'],
+                itertools.chain.from_iterable(readings_batches),
+                readings_path
+            )
+            print(f"Exported {readings_count} records to {readings_path}")
         
         return True
-    except (sqlite3.Error, pd.io.sql.DatabaseError) as e:
+    except (sqlite3.Error, OSError) as e:
         logger.error(f"Error exporting data: {e}")
         return False
 
 def rebuild_database(conn, output_path):
     """Rebuild the database to optimize storage and fix any corruption"""
+    # Only a file this function creates is removed again when the rebuild fails
+    created_output = not os.path.exists(output_path)
+    
     try:
-        # Create new database
-        new_conn = sqlite3.connect(output_path)
-        
-        # Export schema
+        # Export schema, skipping SQLite's internal objects (e.g. sqlite_sequence)
         cursor = conn.cursor()
-        cursor.execute("SELECT sql FROM sqlite_master WHERE sql IS NOT NULL")
-        schema_statements = cursor.fetchall()
+        cursor.execute("""
+        SELECT type, name, sql FROM sqlite_master
+        WHERE sql IS NOT NULL AND type IN ('table', 'index') AND name NOT LIKE 'sqlite_%'
+        """)
+        schema = cursor.fetchall()
+        tables = [name for obj_type, name, _ in schema if obj_type == 'table']
         
-        # Apply schema to new database
-        for statement in schema_statements:
-            if statement[0].startswith('CREATE TABLE') or statement[0].startswith('CREATE INDEX'):
-                new_conn.execute(statement[0])
+        # Create the tables in the new database; indexes are built after the copy
+        new_conn = sqlite3.connect(output_path)
+        for obj_type, _, sql in schema:
+            if obj_type == 'table':
+                new_conn.execute(sql)
+        new_conn.commit()
+        new_conn.close()
         
-        # Copy data
+        # Copy data inside SQLite, without round-tripping rows through Python
         print("Copying data to new database (this may take a while)...")
+        conn.execute("ATTACH DATABASE ? AS newdb", (output_path,))
         
-        # Copy sensor_data
-        data_df = pd.read_sql_query("SELECT * FROM sensor_data", conn)
-        data_df.to_sql('sensor_data', new_conn, if_exists='append', index=False)
-        
-        # Copy sensor_readings
-        readings_df = pd.read_sql_query("SELECT * FROM sensor_readings", conn)
-        readings_df.to_sql('sensor_readings', new_conn, if_exists='append', index=False)
-        
-        # Copy performance_stats if it exists
+        # Copy rows as they are, orphaned readings included; tables are copied
+        # one by one, so parents may not exist yet when their children arrive
+        foreign_keys = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+        conn.execute("PRAGMA foreign_keys = OFF")
         try:
-            stats_df = pd.read_sql_query("SELECT * FROM performance_stats", conn)
-            stats_df.to_sql('performance_stats', new_conn, if_exists='append', index=False)
-        except:
-            print("No performance_stats table found")
-        
-        # Optimize the new database
+            # The copy is re-runnable, so skip fsyncs on the new file; the
+            # setting goes away with the DETACH
+            conn.execute("PRAGMA newdb.synchronous = OFF")
+            conn.execute("BEGIN IMMEDIATE")
+            for table in tables:
+                conn.execute(f'INSERT INTO newdb."{table}" SELECT * FROM main."{table}"')
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        finally:
+            conn.execute(f"PRAGMA foreign_keys = {foreign_keys}")
+            conn.execute("DETACH DATABASE newdb")
+        
+        # Build indexes and optimize the new database
+        new_conn = sqlite3.connect(output_path)
+        new_conn.execute("PRAGMA synchronous = OFF")
+        for obj_type, _, sql in schema:
+            if obj_type == 'index':
+                new_conn.execute(sql)
+        new_conn.commit()
         new_conn.execute("VACUUM")
         new_conn.execute("ANALYZE")
         
@@ -261,52 +405,60 @@ def rebuild_database(conn, output_path):
         print(f"Database rebuilt and saved to {output_path}")
         
         return True
-    except Exception as e:
+    except sqlite3.Error as e:
         logger.error(f"Error rebuilding database: {e}")
+        
+        # Don't leave a half-written copy behind
+        if created_output:
+            for suffix in ("", "-journal", "-wal", "-shm"):
+                if os.path.exists(output_path + suffix):
+                    os.remove(output_path + suffix)
         return False
 
 def main():
     parser = argparse.ArgumentParser(description='SQLite Helper for Sensor Database')
     parser.add_argument('--db', required=True, help='Path to SQLite database file')
-    parser.add_argument('--action', required=True, choices=[
+    parser.add_argument('--action', required=True, nargs='+', choices=[
         'check', 'vacuum', 'optimize', 'prune', 'export', 'rebuild'
-    ], help='Action to perform')
+    ], help='Action(s) to perform, in order, on one connection')
     parser.add_argument('--days', type=int, default=30, help='Days of data to keep when pruning')
     parser.add_argument('--output', help='Output directory or file path')
+    parser.add_argument('--deep', action='store_true', help='Run the full integrity_check instead of quick_check')
+    parser.add_argument('--mmap-size', type=int, default=MMAP_SIZE, help='Bytes of the database to memory-map (0 disables)')
     
     args = parser.parse_args()
     
-    # Connect to database
-    conn = connect_to_db(args.db)
+    # Connect to database; the actions share this one connection
+    conn = connect_to_db(args.db, mmap_size=args.mmap_size)
     if not conn:
         return 1
     
     try:
-        # Perform requested action
-        if args.action == 'check':
-            check_db_health(conn)
-        
-        elif args.action == 'vacuum':
-            vacuum_database(conn)
-        
-        elif args.action == 'optimize':
-            optimize_database(conn)
-        
-        elif args.action == 'prune':
-            prune_old_data(conn, args.days)
-        
-        elif args.action == 'export':
-            if not args.output:
-                logger.error("Output directory required for export action")
-                return 1
-            export_data_to_csv(conn, args.output)
-        
-        elif args.action == 'rebuild':
-            if not args.output:
-                logger.error("Output file path required for rebuild action")
-                return 1
-            rebuild_database(conn, args.output)
-        
+        for action in args.action:
+            # Perform requested action
+            if action == 'check':
+                check_db_health(conn, deep=args.deep)
+            
+            elif action == 'vacuum':
+                vacuum_database(conn)
+            
+            elif action == 'optimize':
+                optimize_database(conn)
+            
+            elif action == 'prune':
+                prune_old_data(conn, args.days)
+            
+            elif action == 'export':
+                if not args.output:
+                    logger.error("Output directory required for export action")
+                    return 1
+                export_data_to_csv(conn, args.output)
+            
+            elif action == 'rebuild':
+                if not args.output:
+                    logger.error("Output file path required for rebuild action")
+                    return 1
+                rebuild_database(conn, args.output)
     finally:
         conn.close()
     
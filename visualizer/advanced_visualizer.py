@@ -5,12 +5,61 @@ Extends the basic visualizer with advanced processing capabilities.
 """
 import numpy as np
 import open3d as o3d
-from scipy.spatial import Delaunay
 import logging
-from visualizer import LidarVisualizer
+from visualizer import LidarVisualizer, AXIS_COLORS, make_point_cloud
 
 logger = logging.getLogger('advanced-visualizer')
 
+# Points drawn in the low-opacity 'Original Points' context trace
+MAX_CONTEXT_POINTS = 50000
+
+# Above this many points, outlier removal runs on voxel centroids instead
+OUTLIER_PROXY_MIN_POINTS = 20000
+OUTLIER_VOXEL_SIZE = 2.0
+
+# Voxel edge length (cm) used to downsample dense clouds before RANSAC and DBSCAN;
+# clouds of at most VOXEL_MIN_POINTS points (e.g. ordinary sweeps) are used as they are
+VOXEL_SIZE = 5.0
+VOXEL_MIN_POINTS = 20000
+
+# Two-digit hex strings for every 0-255 channel value
+HEX_BYTES = np.array([f'{i:02x}' for i in range(256)])
+
+# Palette cycled through by cluster index in the enhanced figure
+CLUSTER_COLORS = [
+    'rgb(255,0,0)', 'rgb(0,0,255)', 'rgb(255,255,0)',
+    'rgb(255,0,255)', 'rgb(0,255,255)', 'rgb(255,128,0)',
+    'rgb(128,0,255)', 'rgb(0,255,128)', 'rgb(128,128,255)',
+    'rgb(255,128,128)'
+]
+
+# Stepped colorscale giving palette index i exactly CLUSTER_COLORS[i]
+CLUSTER_COLORSCALE = [
+    [(i + offset) / len(CLUSTER_COLORS), color]
+    for i, color in enumerate(CLUSTER_COLORS)
+    for offset in (0, 1)
+]
+
+def voxel_downsample(points, voxel_size):
+    """Average points per voxel, returning the voxel centroids and each point's voxel index"""
+    voxels = np.floor(points / voxel_size).astype(np.int64)
+    _, voxel_index, counts = np.unique(voxels, axis=0, return_inverse=True, return_counts=True)
+    voxel_index = voxel_index.reshape(-1)
+    
+    centroids = np.column_stack([
+        np.bincount(voxel_index, weights=points[:, axis], minlength=len(counts))
+        for axis in range(points.shape[1])
+    ]) / counts[:, None]
+    return centroids, voxel_index
+
+def colors_to_plotly(colors):
+    """Convert an Nx3 array of 0-1 RGB floats to Plotly '#rrggbb' color strings"""
+    # Truncate to 0-255 like int(c*255), then build the strings with array ops
+    rgb = (np.clip(colors, 0, 1) * 255).astype(np.uint8)
+    hex_colors = np.char.add('#', HEX_BYTES[rgb[:, 0]])
+    hex_colors = np.char.add(hex_colors, HEX_BYTES[rgb[:, 1]])
+    return np.char.add(hex_colors, HEX_BYTES[rgb[:, 2]])
+
 class AdvancedLidarVisualizer(LidarVisualizer):
     """Extends LidarVisualizer with advanced processing capabilities"""
     
@@ -18,15 +67,42 @@ class AdvancedLidarVisualizer(LidarVisualizer):
         """Initialize with database path"""
         super().__init__(db_path)
         self.ground_plane = None
+        self.max_context_points = MAX_CONTEXT_POINTS
     
-    def filter_outliers(self, points, nb_neighbors=20, std_ratio=2.0):
+    def filter_outliers(self, points, nb_neighbors=20, std_ratio=2.0, pcd=None,
+                        proxy_min_points=OUTLIER_PROXY_MIN_POINTS, voxel_size=OUTLIER_VOXEL_SIZE):
         """Filter outlier points using statistical outlier removal"""
         if len(points) < nb_neighbors + 1:
             logger.warning(f"Not enough points for outlier removal (need {nb_neighbors+1}, have {len(points)})")
-            return points, np.arange(len(points))
-        
-        pcd = o3d.geometry.PointCloud()
-        pcd.points = o3d.utility.Vector3dVector(points)
+            return points, np.arange(len(points)), pcd
+        
+        # On dense scans, judge local density on the voxel centroids and keep
+        # every point whose voxel survives, instead of a k-NN search per point
+        if len(points) > proxy_min_points:
+            try:
+                centroids, voxel_index = voxel_downsample(points, voxel_size)
+                if len(centroids) > nb_neighbors:
+                    _, kept_voxels = make_point_cloud(centroids).remove_statistical_outlier(
+                        nb_neighbors=nb_neighbors,
+                        std_ratio=std_ratio
+                    )
+                    voxel_kept = np.zeros(len(centroids), dtype=bool)
+                    voxel_kept[np.asarray(kept_voxels)] = True
+                    indices = np.flatnonzero(voxel_kept[voxel_index])
+                    
+                    filtered_points = points[indices]
+                    
+                    # No cloud of the surviving points is built here; a later
+                    # stage makes one only if it needs it
+                    logger.info(f"Filtered {len(points) - len(filtered_points)} outlier points")
+                    return filtered_points, indices, None
+            except Exception as e:
+                logger.error(f"Error in outlier removal: {e}")
+                return points, np.arange(len(points)), pcd
+        
+        # Reuse the caller's point cloud for these points when given one
+        if pcd is None:
+            pcd = make_point_cloud(points)
         
         # Perform statistical outlier removal
         try:
@@ -39,23 +115,32 @@ class AdvancedLidarVisualizer(LidarVisualizer):
             filtered_points = np.asarray(cleaned.points)
             
             logger.info(f"Filtered {len(points) - len(filtered_points)} outlier points")
-            return filtered_points, np.array(indices)
+            return filtered_points, np.array(indices), cleaned
         except Exception as e:
             logger.error(f"Error in outlier removal: {e}")
-            return points, np.arange(len(points))
+            return points, np.arange(len(points)), pcd
     
-    def segment_ground_plane(self, points, distance_threshold=10.0, ransac_n=3, num_iterations=100):
+    def segment_ground_plane(self, points, distance_threshold=10.0, ransac_n=3, num_iterations=100,
+                             pcd=None, voxel_size=VOXEL_SIZE, voxel_min_points=VOXEL_MIN_POINTS):
         """Segment ground plane from point cloud using RANSAC"""
         if len(points) < ransac_n:
             logger.warning(f"Not enough points for ground plane segmentation (need {ransac_n}, have {len(points)})")
-            return points, np.array([]), np.array([])
-        
-        pcd = o3d.geometry.PointCloud()
-        pcd.points = o3d.utility.Vector3dVector(points)
+            return points, np.array([]), np.array([]), None
         
         try:
+            # Fit the plane to voxel centroids, which is much cheaper on dense clouds
+            centroids = None
+            if voxel_size and len(points) > voxel_min_points:
+                centroids = voxel_downsample(points, voxel_size)[0]
+            downsampled = centroids is not None and len(centroids) >= ransac_n
+            if downsampled:
+                fit_pcd = make_point_cloud(centroids)
+            else:
+                # Reuse the caller's point cloud for these points when given one
+                fit_pcd = pcd if pcd is not None else make_point_cloud(points)
+            
             # Apply RANSAC to find the ground plane
-            plane_model, inliers = pcd.segment_plane(
+            plane_model, _ = fit_pcd.segment_plane(
                 distance_threshold=distance_threshold,
                 ransac_n=ransac_n,
                 num_iterations=num_iterations
@@ -67,52 +152,73 @@ class AdvancedLidarVisualizer(LidarVisualizer):
             # Store the ground plane parameters
             self.ground_plane = plane_model
             
-            # Extract inlier and outlier points
-            inlier_cloud = pcd.select_by_index(inliers)
-            outlier_cloud = pcd.select_by_index(inliers, invert=True)
+            # Classify every original point by its distance to the plane
+            normal = np.array([a, b, c])
+            ground_mask = np.abs(points @ normal + d) <= distance_threshold * np.linalg.norm(normal)
+            inliers = np.flatnonzero(ground_mask)
+            inlier_points = points[ground_mask]
+            outlier_points = points[~ground_mask]
             
-            # Convert back to numpy array
-            inlier_points = np.asarray(inlier_cloud.points)
-            outlier_points = np.asarray(outlier_cloud.points)
+            # Hand on a cloud of the non-ground points when the plane was fit to
+            # the points themselves, so clustering doesn't build another one
+            outlier_cloud = None
+            if not downsampled:
+                outlier_cloud = fit_pcd.select_by_index(inliers, invert=True)
             
             logger.info(f"Ground plane segmentation: {len(inlier_points)} inliers, {len(outlier_points)} outliers")
             logger.info(f"Plane equation: {a:.3f}x + {b:.3f}y + {c:.3f}z + {d:.3f} = 0")
             
-            return inlier_points, outlier_points, np.array(inliers)
+            return inlier_points, outlier_points, inliers, outlier_cloud
         except Exception as e:
             logger.error(f"Error in ground plane segmentation: {e}")
-            return points, np.array([]), np.array([])
+            return points, np.array([]), np.array([]), None
     
-    def cluster_points(self, points, eps=30.0, min_points=10):
+    def cluster_points(self, points, eps=30.0, min_points=10, pcd=None, voxel_size=VOXEL_SIZE,
+                       voxel_min_points=VOXEL_MIN_POINTS):
         """Cluster points using DBSCAN clustering"""
         if len(points) < min_points:
             logger.warning(f"Not enough points for clustering (need {min_points}, have {len(points)})")
-            return [], []
-        
-        pcd = o3d.geometry.PointCloud()
-        pcd.points = o3d.utility.Vector3dVector(points)
+            return [], [], np.empty((0, 3))
         
         try:
-            # Apply DBSCAN clustering
-            labels = np.array(pcd.cluster_dbscan(eps=eps, min_points=min_points))
+            if voxel_size and len(points) > voxel_min_points:
+                # Cluster the voxel centroids of dense clouds (min_points then counts voxels),
+                # then give every point the label of its voxel
+                centroids, voxel_index = voxel_downsample(points, voxel_size)
+                voxel_labels = np.array(make_point_cloud(centroids).cluster_dbscan(eps=eps, min_points=min_points))
+                labels = voxel_labels[voxel_index]
+            else:
+                # Reuse the caller's point cloud for these points when given one
+                if pcd is None:
+                    pcd = make_point_cloud(points)
+                
+                # Apply DBSCAN clustering
+                labels = np.array(pcd.cluster_dbscan(eps=eps, min_points=min_points))
             
-            # Find the unique cluster labels (excluding noise label -1)
-            unique_labels = np.unique(labels)
-            unique_labels = unique_labels[unique_labels >= 0]
+            # Drop noise points (label -1), then group the rest by label with one
+            # stable sort instead of a full pass over the labels per cluster
+            mask = labels >= 0
+            order = np.argsort(labels[mask], kind='stable')
+            sorted_labels = labels[mask][order]
+            sorted_points = points[mask][order]
             
-            # Extract points for each cluster
-            clusters = []
-            for label in unique_labels:
-                cluster_indices = np.where(labels == label)[0]
-                cluster_points = points[cluster_indices]
-                clusters.append(cluster_points)
+            # Split the sorted points where each cluster's run of labels starts
+            _, starts = np.unique(sorted_labels, return_index=True)
+            clusters = np.split(sorted_points, starts[1:]) if len(starts) > 0 else []
+            
+            # Mean of every cluster from the same sorted layout in one pass
+            if len(starts) > 0:
+                counts = np.diff(np.append(starts, len(sorted_points)))
+                centers = np.add.reduceat(sorted_points, starts, axis=0) / counts[:, None]
+            else:
+                centers = np.empty((0, points.shape[1]))
             
             logger.info(f"Clustering found {len(clusters)} clusters")
             
-            return clusters, labels
+            return clusters, labels, centers
         except Exception as e:
             logger.error(f"Error in clustering: {e}")
-            return [], []
+            return [], [], np.empty((0, 3))
     
     def create_mesh_from_points(self, points, alpha=0.5):
         """Create a mesh from points using Alpha Shapes"""
@@ -120,19 +226,20 @@ class AdvancedLidarVisualizer(LidarVisualizer):
             logger.warning(f"Not enough points for mesh creation (need at least 4, have {len(points)})")
             return None
         
-        pcd = o3d.geometry.PointCloud()
-        pcd.points = o3d.utility.Vector3dVector(points)
+        pcd = make_point_cloud(points)
         
         try:
-            # Compute alpha shape
-            # First compute the convex hull as a fallback
-            mesh = o3d.geometry.TetraMesh.create_from_point_cloud(pcd)[0]
-            
-            # Then try to compute an alpha shape if we have enough points
+            # Compute the alpha shape directly if we have enough points
+            mesh = None
             if len(points) > 10:
-                alpha_mesh = o3d.geometry.TriangleMesh.create_from_point_cloud_alpha_shape(pcd, alpha)
-                if len(alpha_mesh.triangles) > 0:
-                    mesh = alpha_mesh
+                try:
+                    mesh = o3d.geometry.TriangleMesh.create_from_point_cloud_alpha_shape(pcd, alpha)
+                except Exception as e:
+                    logger.warning(f"Alpha shape failed, using convex hull: {e}")
+            
+            # Only build the convex hull when there is no usable alpha shape
+            if mesh is None or len(mesh.triangles) == 0:
+                mesh = pcd.compute_convex_hull()[0]
             
             logger.info(f"Created mesh with {len(mesh.triangles)} triangles")
             return mesh
@@ -169,14 +276,40 @@ class AdvancedLidarVisualizer(LidarVisualizer):
             logger.error(f"Error calculating object dimensions: {e}")
             return None
     
+    def calculate_cluster_dimensions(self, clusters):
+        """Calculate dimensions of every cluster with one reduction over all their points"""
+        if len(clusters) == 0:
+            return []
+        
+        # Reduce each cluster's run of the concatenated points in one call
+        # instead of a min and a max call per cluster
+        points = np.concatenate(clusters)
+        counts = np.array([len(cluster) for cluster in clusters])
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        min_coords = np.minimum.reduceat(points, starts, axis=0)
+        max_coords = np.maximum.reduceat(points, starts, axis=0)
+        dimensions = max_coords - min_coords
+        centers = (min_coords + max_coords) / 2
+        
+        return [
+            {
+                "center": centers[i],
+                "width": dimensions[i, 0],
+                "depth": dimensions[i, 1],
+                "height": dimensions[i, 2],
+                "min_coords": min_coords[i],
+                "max_coords": max_coords[i]
+            } if counts[i] >= 3 else None
+            for i in range(len(clusters))
+        ]
+    
     def create_bounding_box(self, points):
         """Create an oriented bounding box for points"""
         if len(points) < 3:
             logger.warning(f"Not enough points for bounding box (need at least 3, have {len(points)})")
             return None
         
-        pcd = o3d.geometry.PointCloud()
-        pcd.points = o3d.utility.Vector3dVector(points)
+        pcd = make_point_cloud(points)
         
         try:
             # Create axis-aligned bounding box
@@ -196,28 +329,22 @@ class AdvancedLidarVisualizer(LidarVisualizer):
     def process_scan_with_advanced_features(self, timestamp=None, filter_outliers=True,
                                            segment_ground=True, cluster_objects=True):
         """Process scan with advanced features and return enhanced visualization"""
-        # Get scan data
-        if timestamp:
-            scan_data = self.get_historical_scan(timestamp)
-        else:
-            scan_data = self.get_latest_scan()
+        # Get the scan as points, converting it only if it isn't cached
+        scan = self.get_scan_points(timestamp)
         
-        if not scan_data:
+        if scan is None:
             return None, {}
         
-        # Convert to points
-        points, colors = self.convert_readings_to_points(scan_data)
+        scan_timestamp, points, colors = scan
         
-        if points is None or len(points) == 0:
-            return None, {}
-        
-        # Store original points for comparison
-        original_points = points.copy()
-        original_colors = colors.copy()
+        # Keep the original points for comparison; the cached arrays are
+        # read-only and every stage below returns new arrays
+        original_points = points
+        original_colors = colors
         
         # Results dictionary to store processing results
         results = {
-            "timestamp": scan_data["timestamp"],
+            "timestamp": scan_timestamp,
             "original_points": len(points),
             "filtered_points": 0,
             "ground_points": 0,
@@ -226,9 +353,14 @@ class AdvancedLidarVisualizer(LidarVisualizer):
             "processing_results": {}
         }
         
+        # Each stage hands on the Open3D cloud for the points it returns when it
+        # already has one (or None), so points are copied into a cloud only when
+        # a stage needs it instead of once per stage
+        pcd = None
+        
         # Step 1: Filter outliers if requested
         if filter_outliers and len(points) > 20:
-            filtered_points, indices = self.filter_outliers(points)
+            filtered_points, indices, pcd = self.filter_outliers(points, pcd=pcd)
             filtered_colors = colors[indices]
             results["filtered_points"] = len(filtered_points)
             
@@ -243,9 +375,10 @@ class AdvancedLidarVisualizer(LidarVisualizer):
         object_points = np.array([])
         ground_colors = np.array([])
         object_colors = np.array([])
+        object_pcd = None
         
         if segment_ground and len(points) > 3:
-            ground_points, object_points, ground_indices = self.segment_ground_plane(points)
+            ground_points, object_points, ground_indices, object_pcd = self.segment_ground_plane(points, pcd=pcd)
             
             if len(ground_indices) > 0:
                 ground_colors = colors[ground_indices]
@@ -260,19 +393,18 @@ class AdvancedLidarVisualizer(LidarVisualizer):
         
         # Step 3: Cluster objects if requested
         clusters = []
+        cluster_centers = np.empty((0, 3))
         cluster_colors = []
         
         if cluster_objects and len(object_points) > 10:
-            clusters, labels = self.cluster_points(object_points)
+            clusters, labels, cluster_centers = self.cluster_points(object_points, pcd=object_pcd)
             results["clusters"] = len(clusters)
             
             # Store cluster dimensions
             if len(clusters) > 0:
                 cluster_dimensions = []
                 
-                for i, cluster in enumerate(clusters):
-                    dims = self.calculate_object_dimensions(cluster)
-                    
+                for i, (cluster, dims) in enumerate(zip(clusters, self.calculate_cluster_dimensions(clusters))):
                     if dims:
                         cluster_dimensions.append({
                             "cluster_id": i,
@@ -294,7 +426,8 @@ class AdvancedLidarVisualizer(LidarVisualizer):
             object_points=object_points,
             object_colors=object_colors,
             clusters=clusters,
-            timestamp=scan_data["timestamp"]
+            timestamp=scan_timestamp,
+            cluster_centers=cluster_centers
         )
         
         return fig, results
@@ -302,17 +435,24 @@ class AdvancedLidarVisualizer(LidarVisualizer):
     def create_enhanced_plotly_figure(self, original_points, original_colors,
                                      ground_points, ground_colors,
                                      object_points, object_colors,
-                                     clusters, timestamp):
+                                     clusters, timestamp, cluster_centers=None):
         """Create an enhanced Plotly figure with segmented point cloud data"""
         import plotly.graph_objects as go
         
         # Create a new figure
         fig = go.Figure()
         
+        # The original points are only faint context, so a fixed random subset
+        # looks the same while keeping the figure payload small
+        if len(original_points) > self.max_context_points:
+            idx = np.random.default_rng(0).choice(len(original_points), self.max_context_points, replace=False)
+            original_points = original_points[idx]
+            original_colors = original_colors[idx]
+        
         # Add the original points with low opacity if we have segmented data
         if len(ground_points) > 0 or len(clusters) > 0:
             # Convert colors to format expected by Plotly
-            colors_rgb = [f'rgb({int(r*255)},{int(g*255)},{int(b*255)})' for r, g, b in original_colors]
+            colors_rgb = colors_to_plotly(original_colors)
             
             fig.add_trace(go.Scatter3d(
                 x=original_points[:, 0],
@@ -331,7 +471,7 @@ class AdvancedLidarVisualizer(LidarVisualizer):
         if len(ground_points) > 0:
             # Convert colors to format expected by Plotly
             if len(ground_colors) > 0:
-                colors_rgb = [f'rgb({int(r*255)},{int(g*255)},{int(b*255)})' for r, g, b in ground_colors]
+                colors_rgb = colors_to_plotly(ground_colors)
             else:
                 colors_rgb = 'rgb(0,255,0)'  # Green for ground
             
@@ -352,7 +492,7 @@ class AdvancedLidarVisualizer(LidarVisualizer):
         if len(object_points) > 0 and len(clusters) == 0:
             # Convert colors to format expected by Plotly
             if len(object_colors) > 0:
-                colors_rgb = [f'rgb({int(r*255)},{int(g*255)},{int(b*255)})' for r, g, b in object_colors]
+                colors_rgb = colors_to_plotly(object_colors)
             else:
                 colors_rgb = 'rgb(255,0,0)'  # Red for objects
             
@@ -371,70 +511,59 @@ class AdvancedLidarVisualizer(LidarVisualizer):
         
         # Add clusters if available
         if len(clusters) > 0:
-            # Define colors for clusters
-            cluster_colors = [
-                'rgb(255,0,0)', 'rgb(0,0,255)', 'rgb(255,255,0)', 
-                'rgb(255,0,255)', 'rgb(0,255,255)', 'rgb(255,128,0)',
-                'rgb(128,0,255)', 'rgb(0,255,128)', 'rgb(128,128,255)',
-                'rgb(255,128,128)'
-            ]
+            # All cluster points in one trace, colored by cluster id through a
+            # stepped colorscale so the palette cycles every len(CLUSTER_COLORS)
+            cluster_ids = np.repeat(np.arange(len(clusters)), [len(cluster) for cluster in clusters])
+            cluster_points = np.concatenate(clusters)
             
-            for i, cluster in enumerate(clusters):
-                color = cluster_colors[i % len(cluster_colors)]
-                
-                fig.add_trace(go.Scatter3d(
-                    x=cluster[:, 0],
-                    y=cluster[:, 1],
-                    z=cluster[:, 2],
-                    mode='markers',
-                    marker=dict(
-                        size=5,
-                        color=color,
-                        opacity=0.9
-                    ),
-                    name=f'Cluster {i+1}'
-                ))
-                
-                # Calculate center of cluster
-                center = np.mean(cluster, axis=0)
-                
-                # Add a slightly larger marker at the center of the cluster
-                fig.add_trace(go.Scatter3d(
-                    x=[center[0]],
-                    y=[center[1]],
-                    z=[center[2]],
-                    mode='markers',
-                    marker=dict(
-                        size=10,
-                        color=color,
-                        symbol='diamond',
-                        opacity=1.0
-                    ),
-                    name=f'Center {i+1}'
-                ))
+            fig.add_trace(go.Scatter3d(
+                x=cluster_points[:, 0],
+                y=cluster_points[:, 1],
+                z=cluster_points[:, 2],
+                mode='markers',
+                marker=dict(
+                    size=5,
+                    color=cluster_ids % len(CLUSTER_COLORS),
+                    colorscale=CLUSTER_COLORSCALE,
+                    cmin=-0.5,
+                    cmax=len(CLUSTER_COLORS) - 0.5,
+                    showscale=False,
+                    opacity=0.9
+                ),
+                name='Clusters'
+            ))
+            
+            # Add a slightly larger marker at the center of each cluster, all in one trace
+            centers = cluster_centers
+            if centers is None or len(centers) != len(clusters):
+                centers = np.array([np.mean(cluster, axis=0) for cluster in clusters])
+            
+            fig.add_trace(go.Scatter3d(
+                x=centers[:, 0],
+                y=centers[:, 1],
+                z=centers[:, 2],
+                mode='markers',
+                marker=dict(
+                    size=10,
+                    color=[CLUSTER_COLORS[i % len(CLUSTER_COLORS)] for i in range(len(clusters))],
+                    symbol='diamond',
+                    opacity=1.0
+                ),
+                text=[f'Center {i+1}' for i in range(len(clusters))],
+                name='Cluster centers'
+            ))
         
         # Add coordinate axes
         axis_length = 50  # A fixed length for better visibility
         
-        # X-axis (red)
-        fig.add_trace(go.Scatter3d(
-            x=[0, axis_length], y=[0, 0], z=[0, 0],
-            line=dict(color='red', width=4),
-            name='X-axis'
-        ))
-        
-        # Y-axis (green)
-        fig.add_trace(go.Scatter3d(
-            x=[0, 0], y=[0, axis_length], z=[0, 0],
-            line=dict(color='green', width=4),
-            name='Y-axis'
-        ))
-        
-        # Z-axis (blue)
+        # X (red), Y (green) and Z (blue) axes as one trace, segments separated by None
         fig.add_trace(go.Scatter3d(
-            x=[0, 0], y=[0, 0], z=[0, axis_length],
-            line=dict(color='blue', width=4),
-            name='Z-axis'
+            x=[0, axis_length, None, 0, 0, None, 0, 0],
+            y=[0, 0, None, 0, axis_length, None, 0, 0],
+            z=[0, 0, None, 0, 0, None, 0, axis_length],
+            mode='lines',
+            line=dict(color=AXIS_COLORS, width=4),
+            name='Axes'
         ))
         
         # Update layout
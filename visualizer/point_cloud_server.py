@@ -6,19 +6,17 @@ Uses Dash and Plotly for interactive visualization.
 """
 import os
 import time
-import json
 import dash
 from dash import dcc, html, callback
 from dash.dependencies import Input, Output, State
 import dash_bootstrap_components as dbc
 import plotly.graph_objects as go
-import pandas as pd
 from datetime import datetime
-import sqlite3
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import logging
 
 # Import the visualization core
-from visualizer import LidarVisualizer
+from visualizer import LidarVisualizer, POOL_SIZE, write_binary_ply
 
 # Configure logging
 logging.basicConfig(
@@ -31,6 +29,23 @@ logger = logging.getLogger('point-cloud-server')
 DB_PATH = os.environ.get("DB_PATH", "/data/sensor_data.db")
 visualizer = LidarVisualizer(DB_PATH)
 
+# Database-backed calls run on their own threads, one per pooled connection, so
+# a burst of callbacks queues here instead of piling onto SQLite
+DB_EXECUTOR = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="db-reader")
+DB_QUERY_TIMEOUT = 5.0  # Seconds a callback waits for a database-backed call
+
+def run_db(func, *args, **kwargs):
+    """Run a database-backed visualizer call on the DB executor and wait for its result"""
+    future = DB_EXECUTOR.submit(func, *args, **kwargs)
+    try:
+        return future.result(timeout=DB_QUERY_TIMEOUT)
+    except FutureTimeoutError:
+        logger.error(f"{func.__name__} did not finish within {DB_QUERY_TIMEOUT} seconds")
+        return None
+
+# Newest scans whose figures are sent to the browser ahead of being selected
+FIGURE_PRELOAD_COUNT = 10
+
 # Create the Dash app
 app = dash.Dash(
     __name__,
@@ -65,6 +80,15 @@ app.layout = dbc.Container([
                         className="mb-3"
                     ),
                     
+                    # 3D view toggle (the default top-down view renders far more points)
+                    dbc.Checklist(
+                        options=[{"label": "3D view", "value": True}],
+                        value=[],
+                        id="view-3d-toggle",
+                        switch=True,
+                        className="mb-3"
+                    ),
+                    
                     # Timestamp selector
                     html.Div([
                         html.Label("Select Timestamp:"),
@@ -107,6 +131,7 @@ app.layout = dbc.Container([
     
     # Hidden div for storing state
     dcc.Store(id="timestamps-store"),
+    dcc.Store(id="figures-store"),
     
     # Interval component for auto-refresh
     dcc.Interval(
@@ -124,16 +149,23 @@ app.layout = dbc.Container([
 def toggle_auto_refresh(value):
     return not value or len(value) == 0
 
-# Callback to update timestamp dropdown options
+# Callback to refresh the timestamp list and database information together,
+# so each refresh borrows one connection for all of its queries
 @app.callback(
     Output("timestamps-store", "data"),
     Output("timestamp-dropdown", "options"),
+    Output("db-info-content", "children"),
     Input("refresh-button", "n_clicks"),
     Input("auto-refresh-interval", "n_intervals")
 )
-def update_timestamp_options(n_clicks, n_intervals):
+def refresh_data(n_clicks, n_intervals):
+    summary = run_db(visualizer.get_db_summary, limit=100)
+    
+    if summary is None:
+        return [], [], "Database information unavailable"
+    
     # Get available timestamps
-    timestamps = visualizer.get_timestamp_list(limit=100)
+    timestamps = summary["timestamps"]
     
     # Format for dropdown
     options = [
@@ -142,7 +174,7 @@ def update_timestamp_options(n_clicks, n_intervals):
     ]
     
     # Store timestamps for later use
-    return timestamps, options
+    return timestamps, options, format_db_info(summary)
 
 # Callback to update the timestamp dropdown value to the latest timestamp
 @app.callback(
@@ -161,13 +193,63 @@ def update_dropdown_value(timestamps, current_value):
     # Otherwise, keep the current selection
     return current_value
 
-# Callback for the point cloud visualization
+# Build the newest scans' figures once per refresh and hand them to the browser,
+# so switching between them happens client-side without a server round trip
 @app.callback(
+    Output("figures-store", "data"),
+    Input("timestamps-store", "data"),
+    Input("view-3d-toggle", "value"),
+    State("figures-store", "data")
+)
+def preload_figures(timestamps, view_3d, store):
+    planar = not view_3d
+    wanted = (timestamps or [])[:FIGURE_PRELOAD_COUNT]
+    
+    # Nothing new to send when the browser already holds these figures
+    if store and store["planar"] == planar and store["timestamps"] == wanted:
+        return dash.no_update
+    
+    preloaded = []
+    figures = []
+    
+    for ts in wanted:
+        figure = run_db(visualizer.get_figure_dict, ts, planar=planar)
+        if figure is not None:
+            preloaded.append(ts)
+            figures.append(figure)
+    
+    return {"planar": planar, "timestamps": preloaded, "figures": figures}
+
+# Show a preloaded figure straight from the store when there is one
+app.clientside_callback(
+    """
+    function(timestamp, view3d, store) {
+        const planar = !(view3d && view3d.length);
+        if (store && store.planar === planar) {
+            const index = store.timestamps.indexOf(timestamp);
+            if (index >= 0) {
+                return store.figures[index];
+            }
+        }
+        return window.dash_clientside.no_update;
+    }
+    """,
     Output("point-cloud-graph", "figure"),
+    Input("timestamp-dropdown", "value"),
+    Input("view-3d-toggle", "value"),
+    Input("figures-store", "data")
+)
+
+# Callback for the point cloud visualization (scans that weren't preloaded) and its metadata
+@app.callback(
+    Output("point-cloud-graph", "figure", allow_duplicate=True),
     Output("scan-metadata", "children"),
-    Input("timestamp-dropdown", "value")
+    Input("timestamp-dropdown", "value"),
+    Input("view-3d-toggle", "value"),
+    State("figures-store", "data"),
+    prevent_initial_call=True
 )
-def update_point_cloud(timestamp):
+def update_point_cloud(timestamp, view_3d, store):
     # Default empty figure
     empty_fig = go.Figure()
     empty_fig.update_layout(
@@ -182,77 +264,54 @@ def update_point_cloud(timestamp):
     if timestamp is None:
         return empty_fig, "No data selected"
     
-    # Generate point cloud for the selected timestamp
-    fig = visualizer.process_scan_by_timestamp(timestamp)
+    scan = run_db(visualizer.get_scan_points, timestamp)
     
-    if fig is None:
+    if scan is None:
         return empty_fig, "Failed to generate point cloud"
     
-    # Get metadata for display
-    metadata = visualizer.get_latest_metadata()
+    # Figures the browser holds for this view are already drawn by the clientside callback
+    if store and store["planar"] == (not view_3d) and timestamp in store["timestamps"]:
+        fig = dash.no_update
+    else:
+        # Historical scans never change, so repeat selections reuse the built figure
+        fig = run_db(visualizer.get_figure_dict, timestamp, planar=not view_3d)
     
     metadata_html = html.Div([
-        html.P(f"Timestamp: {metadata.get('datetime', 'Unknown')}"),
-        html.P(f"Points: {metadata.get('point_count', 0)}")
+        html.P(f"Timestamp: {datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')}"),
+        html.P(f"Points: {len(scan[1])}")
     ])
     
     return fig, metadata_html
 
-# Callback for database information
-@app.callback(
-    Output("db-info-content", "children"),
-    Input("refresh-button", "n_clicks"),
-    Input("auto-refresh-interval", "n_intervals")
-)
-def update_db_info(n_clicks, n_intervals):
-    try:
-        # Connect to database
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Get message count
-        cursor.execute("SELECT COUNT(*) FROM sensor_data")
-        message_count = cursor.fetchone()[0]
-        
-        # Get time range
-        cursor.execute("SELECT MIN(timestamp), MAX(timestamp) FROM sensor_data")
-        time_range = cursor.fetchone()
+def format_db_info(summary):
+    """Format the database statistics for the information card"""
+    time_range = summary["time_range"]
+    
+    if time_range[0] and time_range[1]:
+        start_time = datetime.fromtimestamp(time_range[0]).strftime("%Y-%m-%d %H:%M:%S")
+        end_time = datetime.fromtimestamp(time_range[1]).strftime("%Y-%m-%d %H:%M:%S")
+        duration = time_range[1] - time_range[0]
         
-        if time_range[0] and time_range[1]:
-            start_time = datetime.fromtimestamp(time_range[0]).strftime("%Y-%m-%d %H:%M:%S")
-            end_time = datetime.fromtimestamp(time_range[1]).strftime("%Y-%m-%d %H:%M:%S")
-            duration = time_range[1] - time_range[0]
-            
-            # Format duration
-            if duration < 60:
-                duration_str = f"{duration:.1f} seconds"
-            elif duration < 3600:
-                duration_str = f"{duration/60:.1f} minutes"
-            else:
-                duration_str = f"{duration/3600:.1f} hours"
+        # Format duration
+        if duration < 60:
+            duration_str = f"{duration:.1f} seconds"
+        elif duration < 3600:
+            duration_str = f"{duration/60:.1f} minutes"
         else:
-            start_time = "N/A"
-            end_time = "N/A"
-            duration_str = "N/A"
-        
-        # Get scan count
-        cursor.execute("SELECT COUNT(DISTINCT timestamp) FROM sensor_data")
-        scan_count = cursor.fetchone()[0]
-        
-        conn.close()
-        
-        # Create info display
-        return html.Div([
-            html.P(f"Database: {os.path.basename(DB_PATH)}"),
-            html.P(f"Total Messages: {message_count}"),
-            html.P(f"Unique Scans: {scan_count}"),
-            html.P(f"Time Range: {start_time} to {end_time}"),
-            html.P(f"Duration: {duration_str}")
-        ])
-        
-    except Exception as e:
-        logger.error(f"Error getting database info: {e}")
-        return "Database information unavailable"
+            duration_str = f"{duration/3600:.1f} hours"
+    else:
+        start_time = "N/A"
+        end_time = "N/A"
+        duration_str = "N/A"
+    
+    # Create info display
+    return html.Div([
+        html.P(f"Database: {os.path.basename(DB_PATH)}"),
+        html.P(f"Total Messages: {summary['message_count']}"),
+        html.P(f"Unique Scans: {summary['scan_count']}"),
+        html.P(f"Time Range: {start_time} to {end_time}"),
+        html.P(f"Duration: {duration_str}")
+    ])
 
 # Callback for PLY file download
 @app.callback(
@@ -265,18 +324,24 @@ def download_point_cloud(n_clicks, timestamp):
     if timestamp is None:
         return None
     
-    # Process the selected scan to ensure the point cloud is created
-    visualizer.process_scan_by_timestamp(timestamp)
+    # Use this request's own copy of the scan (usually already cached), so a
+    # concurrent view of another scan can't end up in the file
+    scan = run_db(visualizer.get_scan_points, timestamp)
+    if scan is None:
+        return None
     
     # Generate a temporary filename
     filename = f"/tmp/point_cloud_{timestamp}.ply"
     
     # Save the point cloud
-    if visualizer.save_point_cloud(filename):
-        # Return the file as a download
-        return dcc.send_file(filename)
+    try:
+        write_binary_ply(filename, scan[1], scan[2])
+    except Exception as e:
+        logger.error(f"Error saving point cloud: {e}")
+        return None
     
-    return None
+    # Return the file as a download
+    return dcc.send_file(filename)
 
 # Run the app
 if __name__ == "__main__":
@@ -5,15 +5,17 @@ Processes LIDAR data from SQLite database and creates 3D point cloud visualizati
 """
 import sqlite3
 import numpy as np
-import pandas as pd
 import open3d as o3d
-import matplotlib.pyplot as plt
-from matplotlib import cm
+import matplotlib
 import time
 import os
+import re
 import logging
-import json
-from scipy.spatial.transform import Rotation
+import pathlib
+import queue
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 import plotly.graph_objects as go
 
 # Configure logging
@@ -23,151 +25,396 @@ logging.basicConfig(
 )
 logger = logging.getLogger('lidar-visualizer')
 
+# Packed readings layout written by the receiver into sensor_data.readings_blob
+READINGS_FORMAT = "float32:angle,distance"
+READINGS_DTYPE = np.dtype('<f4')
+
+# Readings keys of the form "angle_<deg>"
+ANGLE_KEY_PATTERN = re.compile(r'angle_[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?')
+
+# RGB viridis lookup table, indexed by distance normalized to [0, COLORMAP_LUT_SIZE)
+COLORMAP_LUT_SIZE = 256
+VIRIDIS_LUT = matplotlib.colormaps['viridis'].resampled(COLORMAP_LUT_SIZE)(np.arange(COLORMAP_LUT_SIZE))[:, :3].astype(np.float32)
+
+# Vertex layout of exported PLY files: float32 position and 8-bit RGB color
+PLY_VERTEX_DTYPE = np.dtype([('xyz', '<f4', 3), ('rgb', 'u1', 3)])
+PLY_HEADER = (
+    "ply\n"
+    "format binary_little_endian 1.0\n"
+    "element vertex {count}\n"
+    "property float x\n"
+    "property float y\n"
+    "property float z\n"
+    "property uchar red\n"
+    "property uchar green\n"
+    "property uchar blue\n"
+    "end_header\n"
+)
+
+# Per-vertex line colors for the None-separated X/Y/Z axis trace
+AXIS_COLORS = ['red', 'red', 'red', 'green', 'green', 'green', 'blue', 'blue']
+
+# Converted scans and built figures kept per timestamp; a timestamp's scan never changes
+SCAN_CACHE_SIZE = 32
+FIGURE_CACHE_SIZE = 64
+
+# Scans with more points than this are stride-sampled before plotting so the
+# browser's render time stays bounded
+MAX_PLOT_POINTS = int(os.environ.get("MAX_PLOT_POINTS", 20000))
+
+# Read-only connections kept open for the dashboard's request threads
+POOL_SIZE = 4
+
+# Settings for the read-only connections (journal_mode is set by the receiver)
+READER_PRAGMAS = """
+PRAGMA busy_timeout = 5000;
+PRAGMA cache_size = -65536;
+PRAGMA temp_store = MEMORY;
+"""
+
+# Queries are kept as constants so each connection's statement cache reuses
+# the compiled statements across callbacks
+SQL_CACHED_STATEMENTS = 64
+
+SQL_LATEST_TIMESTAMP = "SELECT MAX(timestamp) FROM sensor_data"
+
+SQL_PACKED_SCAN = '''
+SELECT device_id, readings_blob
+FROM sensor_data
+WHERE timestamp = ? AND readings_format = ?
+ORDER BY id DESC
+LIMIT 1
+'''
+
+# Parses the "angle_<deg>" keys in SQL so rows arrive as numeric (angle, distance) pairs
+SQL_LEGACY_SCAN = '''
+SELECT CAST(substr(r.angle, 7) AS REAL) AS angle_deg, r.value
+FROM sensor_data s
+JOIN sensor_readings r ON s.id = r.data_id
+WHERE s.timestamp = ? AND r.angle LIKE 'angle!_%' ESCAPE '!'
+ORDER BY angle_deg
+'''
+
+# Same, for tables that store the numeric angle_deg column
+SQL_LEGACY_SCAN_NUMERIC = '''
+SELECT r.angle_deg, r.value
+FROM sensor_data s
+JOIN sensor_readings r ON s.id = r.data_id
+WHERE s.timestamp = ? AND r.angle_deg IS NOT NULL
+ORDER BY r.angle_deg
+'''
+
+# Device of a legacy scan, fetched once instead of with every reading row
+SQL_SCAN_DEVICE = '''
+SELECT device_id
+FROM sensor_data
+WHERE timestamp = ?
+ORDER BY id DESC
+LIMIT 1
+'''
+
+# Every dashboard statistic in one pass over sensor_data
+SQL_DB_SUMMARY = '''
+SELECT COUNT(*), MIN(timestamp), MAX(timestamp), COUNT(DISTINCT timestamp)
+FROM sensor_data
+'''
+
+# Oldest and newest timestamps and the newest id; each subquery is a single index
+# or rowid lookup, and the result changes whenever rows are added or pruned
+SQL_DATA_VERSION = '''
+SELECT
+    (SELECT MIN(timestamp) FROM sensor_data),
+    (SELECT MAX(timestamp) FROM sensor_data),
+    (SELECT MAX(id) FROM sensor_data)
+'''
+
+SQL_TIMESTAMP_LIST = '''
+SELECT DISTINCT timestamp
+FROM sensor_data
+ORDER BY timestamp DESC
+LIMIT ?
+'''
+
+class ReadConnectionPool:
+    """Read-only SQLite connections that can be shared across threads"""
+    
+    def __init__(self, db_path, size=POOL_SIZE):
+        """Initialize the pool; connections are opened on first use"""
+        self.db_path = db_path
+        self.size = size
+        self._connections = queue.Queue()
+        self._count = 0
+        self._lock = threading.Lock()
+    
+    def _open(self):
+        """Open a read-only connection (fails if the database doesn't exist yet)"""
+        uri = pathlib.Path(self.db_path).resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False, cached_statements=SQL_CACHED_STATEMENTS)
+        conn.executescript(READER_PRAGMAS)
+        
+        # WAL is set by the receiver; without it readers and the writer block each other
+        journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        if journal_mode.lower() != "wal":
+            logger.warning(f"Database is in {journal_mode} mode, not WAL; reads may wait on the receiver")
+        
+        logger.info(f"Connected to database at {self.db_path}")
+        return conn
+    
+    @contextmanager
+    def get_reader(self):
+        """Borrow a connection, waiting if all of them are in use"""
+        try:
+            conn = self._connections.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_open = self._count < self.size
+                if can_open:
+                    self._count += 1
+            if can_open:
+                try:
+                    conn = self._open()
+                except sqlite3.Error:
+                    with self._lock:
+                        self._count -= 1
+                    raise
+            else:
+                conn = self._connections.get()
+        
+        try:
+            yield conn
+        finally:
+            self._connections.put(conn)
+    
+    def close(self):
+        """Close the connections that are currently idle"""
+        while True:
+            try:
+                self._connections.get_nowait().close()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._count -= 1
+
+def write_binary_ply(filename, points, colors):
+    """Write points and [0,1] RGB colors to a binary little-endian PLY file"""
+    vertices = np.empty(len(points), dtype=PLY_VERTEX_DTYPE)
+    vertices['xyz'] = points
+    vertices['rgb'] = np.rint(np.clip(colors, 0, 1) * 255)
+    
+    with open(filename, 'wb') as f:
+        f.write(PLY_HEADER.format(count=len(vertices)).encode('ascii'))
+        vertices.tofile(f)
+
+def make_point_cloud(points, colors=None):
+    """Build an Open3D point cloud from Nx3 numpy arrays of points and optional colors"""
+    # Open3D stores doubles; handing it float64 arrays takes its fast bulk-copy path
+    pcd = o3d.geometry.PointCloud()
+    pcd.points = o3d.utility.Vector3dVector(np.asarray(points, dtype=np.float64))
+    if colors is not None:
+        pcd.colors = o3d.utility.Vector3dVector(np.asarray(colors, dtype=np.float64))
+    return pcd
+
 class LidarVisualizer:
     """Class to handle LIDAR data visualization"""
     
-    def __init__(self, db_path=None):
-        """Initialize with database path"""
+    def __init__(self, db_path=None, pool=None):
+        """Initialize with database path and optionally a shared connection pool"""
         self.db_path = db_path or os.path.join('/data', 'sensor_data.db')
-        self.conn = None
+        self.pool = pool or ReadConnectionPool(self.db_path)
         self.latest_timestamp = None
-        self.point_cloud = None
+        self._points = None
+        self._colors = None
+        self._point_cloud = None
+        self._scan_cache = OrderedDict()
+        self._figure_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._numeric_angles = None
+        self._summary_cache = (None, None)
+        self._trig_cache = (None, None, None)
         
+    @property
+    def point_cloud(self):
+        """Open3D point cloud of the stored scan, built on first use"""
+        if self._point_cloud is None and self._points is not None:
+            self._point_cloud = self.create_open3d_point_cloud(self._points, self._colors)
+        return self._point_cloud
+    
+    def store_point_cloud(self, points, colors):
+        """Keep a scan's points and colors in memory for metadata and export"""
+        self._points = points
+        self._colors = colors
+        self._point_cloud = None
+    
     def connect_to_db(self):
-        """Connect to the SQLite database"""
+        """Check that the SQLite database can be opened"""
         try:
-            self.conn = sqlite3.connect(self.db_path)
-            logger.info(f"Connected to database at {self.db_path}")
-            return True
+            with self.pool.get_reader():
+                return True
         except sqlite3.Error as e:
             logger.error(f"Database connection error: {e}")
             return False
     
     def close_db(self):
-        """Close database connection"""
-        if self.conn:
-            self.conn.close()
-            self.conn = None
+        """Close idle database connections"""
+        self.pool.close()
+    
+    def get_packed_scan(self, cursor, timestamp):
+        """Get the packed readings stored for a timestamp, or None if there are none"""
+        cursor.execute(SQL_PACKED_SCAN, (timestamp, READINGS_FORMAT))
+        row = cursor.fetchone()
+        
+        if not row:
+            return None
+        
+        # Kept as the float32 view of the BLOB; the conversion stays in single precision
+        packed = np.frombuffer(row[1], dtype=READINGS_DTYPE).reshape(-1, 2)
+        
+        return {
+            "timestamp": timestamp,
+            "device_id": row[0],
+            "readings": packed
+        }
+    
+    def get_legacy_scan(self, cursor, timestamp):
+        """Get the one-row-per-reading readings for a timestamp, or None if there are none"""
+        # Check once whether the table stores numeric angles (added by the receiver's migration)
+        if self._numeric_angles is None:
+            cursor.execute("PRAGMA table_info(sensor_readings)")
+            self._numeric_angles = any(row[1] == "angle_deg" for row in cursor.fetchall())
+        
+        # Rows are bare (angle, distance) pairs, so numpy converts them in one call
+        cursor.execute(SQL_LEGACY_SCAN_NUMERIC if self._numeric_angles else SQL_LEGACY_SCAN, (timestamp,))
+        rows = cursor.fetchall()
+        
+        if not rows:
+            return None
+        
+        cursor.execute(SQL_SCAN_DEVICE, (timestamp,))
+        
+        return {
+            "timestamp": timestamp,
+            "device_id": cursor.fetchone()[0],
+            "readings": np.array(rows, dtype=np.float32)
+        }
     
     def get_latest_scan(self):
         """Get the latest complete LIDAR scan from the database"""
-        if not self.conn:
-            if not self.connect_to_db():
-                return None
-        
         try:
-            # Get the latest timestamp
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT MAX(timestamp) FROM sensor_data")
-            latest_time = cursor.fetchone()[0]
-            
-            if not latest_time:
-                logger.warning("No data found in database")
-                return None
-            
-            # Get the latest scan data
-            query = """
-            SELECT s.id, s.timestamp, s.device_id, r.angle, r.value
-            FROM sensor_data s
-            JOIN sensor_readings r ON s.id = r.data_id
-            WHERE s.timestamp = ?
-            ORDER BY r.angle
-            """
-            
-            cursor.execute(query, (latest_time,))
-            rows = cursor.fetchall()
-            
-            if not rows:
-                logger.warning("No readings found for the latest timestamp")
-                return None
-            
-            self.latest_timestamp = latest_time
-            
-            # Process into a structured format
-            readings = {}
-            device_id = rows[0][2]  # All rows have the same device_id for this timestamp
-            
-            for row in rows:
-                angle_key = row[3]  # The angle column (e.g., "angle_90")
-                distance = row[4]   # The value column (distance measurement)
-                readings[angle_key] = distance
-            
-            return {
-                "timestamp": latest_time,
-                "device_id": device_id,
-                "readings": readings
-            }
-            
+            with self.pool.get_reader() as conn:
+                # Get the latest timestamp
+                cursor = conn.cursor()
+                cursor.execute(SQL_LATEST_TIMESTAMP)
+                latest_time = cursor.fetchone()[0]
+                
+                if not latest_time:
+                    logger.warning("No data found in database")
+                    return None
+                
+                # Prefer the packed readings written by the receiver
+                scan = self.get_packed_scan(cursor, latest_time)
+                if scan:
+                    self.latest_timestamp = latest_time
+                    return scan
+                
+                # Fall back to the legacy one-row-per-reading table
+                scan = self.get_legacy_scan(cursor, latest_time)
+                if not scan:
+                    logger.warning("No readings found for the latest timestamp")
+                    return None
+                
+                self.latest_timestamp = latest_time
+                return scan
+                
         except sqlite3.Error as e:
             logger.error(f"Database query error: {e}")
             return None
     
     def get_historical_scan(self, timestamp):
         """Get a specific LIDAR scan by timestamp"""
-        if not self.conn:
-            if not self.connect_to_db():
-                return None
-        
         try:
-            # Get the scan data for the specified timestamp
-            query = """
-            SELECT s.id, s.timestamp, s.device_id, r.angle, r.value
-            FROM sensor_data s
-            JOIN sensor_readings r ON s.id = r.data_id
-            WHERE s.timestamp = ?
-            ORDER BY r.angle
-            """
-            
-            cursor = self.conn.cursor()
-            cursor.execute(query, (timestamp,))
-            rows = cursor.fetchall()
-            
-            if not rows:
-                logger.warning(f"No readings found for timestamp {timestamp}")
-                return None
-            
-            # Process into a structured format
-            readings = {}
-            device_id = rows[0][2]  # All rows have the same device_id for this timestamp
-            
-            for row in rows:
-                angle_key = row[3]  # The angle column (e.g., "angle_90")
-                distance = row[4]   # The value column (distance measurement)
-                readings[angle_key] = distance
-            
-            return {
-                "timestamp": timestamp,
-                "device_id": device_id,
-                "readings": readings
-            }
-            
+            with self.pool.get_reader() as conn:
+                cursor = conn.cursor()
+                
+                # Prefer the packed readings written by the receiver
+                scan = self.get_packed_scan(cursor, timestamp)
+                if scan:
+                    return scan
+                
+                # Fall back to the legacy one-row-per-reading table
+                scan = self.get_legacy_scan(cursor, timestamp)
+                if not scan:
+                    logger.warning(f"No readings found for timestamp {timestamp}")
+                    return None
+                
+                return scan
+                
         except sqlite3.Error as e:
             logger.error(f"Database query error: {e}")
             return None
     
-    def get_timestamp_list(self, limit=100):
-        """Get a list of available timestamps from the database"""
-        if not self.conn:
-            if not self.connect_to_db():
-                return []
-        
+    def get_db_summary(self, limit=100):
+        """Get database statistics and the latest timestamps with one borrowed connection"""
         try:
-            query = """
-            SELECT DISTINCT timestamp 
-            FROM sensor_data 
-            ORDER BY timestamp DESC 
-            LIMIT ?
-            """
-            
-            cursor = self.conn.cursor()
-            cursor.execute(query, (limit,))
-            timestamps = [row[0] for row in cursor.fetchall()]
-            
-            return timestamps
-            
+            with self.pool.get_reader() as conn:
+                cursor = conn.cursor()
+                
+                # Skip the full-table aggregates when no rows were added or pruned since last time
+                cursor.execute(SQL_DATA_VERSION)
+                key = (cursor.fetchone(), limit)
+                cached_key, cached_summary = self._summary_cache
+                if key == cached_key:
+                    return cached_summary
+                
+                cursor.execute(SQL_DB_SUMMARY)
+                message_count, min_time, max_time, scan_count = cursor.fetchone()
+                
+                cursor.execute(SQL_TIMESTAMP_LIST, (limit,))
+                timestamps = [row[0] for row in cursor.fetchall()]
+                
+                summary = {
+                    "message_count": message_count,
+                    "time_range": (min_time, max_time),
+                    "scan_count": scan_count,
+                    "timestamps": timestamps
+                }
+                self._summary_cache = (key, summary)
+                return summary
+                
         except sqlite3.Error as e:
             logger.error(f"Database query error: {e}")
-            return []
+            return None
+    
+    def get_scan_points(self, timestamp=None):
+        """Get (timestamp, points, colors) for a scan, reusing recently converted scans"""
+        if timestamp:
+            with self._cache_lock:
+                cached = self._scan_cache.get(timestamp)
+                if cached is not None:
+                    self._scan_cache.move_to_end(timestamp)
+                    return (timestamp,) + cached
+            scan_data = self.get_historical_scan(timestamp)
+        else:
+            scan_data = self.get_latest_scan()
+        
+        if not scan_data:
+            return None
+        
+        converted = self.convert_readings_to_points(scan_data)
+        if converted is None or len(converted[0]) == 0:
+            return None
+        
+        # Cached arrays are shared between calls, so make them read-only
+        points, colors = converted
+        points.setflags(write=False)
+        colors.setflags(write=False)
+        
+        with self._cache_lock:
+            self._scan_cache[scan_data["timestamp"]] = (points, colors)
+            self._scan_cache.move_to_end(scan_data["timestamp"])
+            if len(self._scan_cache) > SCAN_CACHE_SIZE:
+                self._scan_cache.popitem(last=False)
+        
+        return scan_data["timestamp"], points, colors
     
     def convert_readings_to_points(self, scan_data):
         """Convert LIDAR angle/distance readings to 3D points"""
@@ -175,48 +422,50 @@ class LidarVisualizer:
             return None
         
         readings = scan_data['readings']
-        points = []
-        colors = []
-        
-        # Maximum distance for color normalization
-        max_distance = max(readings.values())
         
-        # Generate a colormap
-        colormap = cm.get_cmap('viridis')
-        
-        for angle_key, distance in readings.items():
-            # Extract angle value from key (e.g., "angle_90" -> 90)
-            try:
-                angle_deg = float(angle_key.split('_')[1])
-            except (IndexError, ValueError):
-                logger.warning(f"Could not parse angle from {angle_key}")
-                continue
+        if isinstance(readings, dict):
+            # Parse every angle key once (e.g., "angle_90" -> 90), skipping any that don't match
+            angle_keys = [key for key in readings if ANGLE_KEY_PATTERN.fullmatch(key)]
+            if len(angle_keys) < len(readings):
+                logger.warning(f"Could not parse angle from {len(readings) - len(angle_keys)} readings keys")
             
-            # Convert to radians
+            angle_deg = np.fromiter((float(key[6:]) for key in angle_keys), dtype=np.float32, count=len(angle_keys))
+            distance = np.fromiter((readings[key] for key in angle_keys), dtype=np.float32, count=len(angle_keys))
+        else:
+            # Scans from the database already hold numeric (angle, distance) rows
+            angle_deg = readings[:, 0]
+            distance = readings[:, 1]
+        
+        # The sensor sweeps the same angles every scan, so reuse cos/sin of the last grid
+        cached_angles, cos_angle, sin_angle = self._trig_cache
+        if cached_angles is None or not np.array_equal(cached_angles, angle_deg):
             angle_rad = np.radians(angle_deg)
-            
-            # Default to 2D planar LIDAR data (all points on the X-Y plane)
-            # LIDAR is typically mounted horizontally, so distances are in the X-Y plane
-            x = distance * np.cos(angle_rad)
-            y = distance * np.sin(angle_rad)
-            z = 0.0  # Planar LIDAR assumption
-            
-            # Append point
-            points.append([x, y, z])
-            
-            # Add color based on distance (normalized to [0,1])
-            norm_distance = distance / max_distance if max_distance > 0 else 0
-            color = colormap(norm_distance)[:3]  # RGB components only
-            colors.append(color)
+            cos_angle = np.cos(angle_rad)
+            sin_angle = np.sin(angle_rad)
+            self._trig_cache = (np.array(angle_deg), cos_angle, sin_angle)
+        
+        # Default to 2D planar LIDAR data (all points on the X-Y plane)
+        # LIDAR is typically mounted horizontally, so distances are in the X-Y plane
+        # Single precision is plenty for the plot, Open3D and PLY export. Points and
+        # colors share one (N,6) buffer and are returned as views of its halves
+        combined = np.empty((len(distance), 6), dtype=np.float32)
+        points = combined[:, :3]
+        colors = combined[:, 3:]
+        np.multiply(distance, cos_angle, out=points[:, 0])
+        np.multiply(distance, sin_angle, out=points[:, 1])
+        points[:, 2] = 0  # Planar LIDAR assumption
         
-        return np.array(points), np.array(colors)
+        # Color based on distance (normalized to [0,1]) with one gather from the viridis table
+        max_distance = distance.max() if len(distance) else 0
+        norm_distance = distance / max_distance if max_distance > 0 else np.zeros_like(distance)
+        lut_index = np.clip((norm_distance * COLORMAP_LUT_SIZE).astype(np.intp), 0, COLORMAP_LUT_SIZE - 1)
+        np.take(VIRIDIS_LUT, lut_index, axis=0, out=colors)
+        
+        return points, colors
     
     def create_open3d_point_cloud(self, points, colors):
         """Create an Open3D point cloud from points and colors"""
-        pcd = o3d.geometry.PointCloud()
-        pcd.points = o3d.utility.Vector3dVector(points)
-        pcd.colors = o3d.utility.Vector3dVector(colors)
-        return pcd
+        return make_point_cloud(points, colors)
     
     def visualize_point_cloud(self, pcd):
         """Visualize the point cloud using Open3D"""
@@ -228,13 +477,48 @@ class LidarVisualizer:
         # Visualize
         o3d.visualization.draw_geometries([pcd, coord_frame])
     
-    def create_plotly_point_cloud(self, points, colors):
+    def create_plotly_point_cloud(self, points, planar=True, timestamp=None):
         """Create a Plotly figure for point cloud visualization"""
         if points is None or len(points) == 0:
             return None
         
-        # Convert colors to format expected by Plotly
-        colors_rgb = [f'rgb({int(r*255)},{int(g*255)},{int(b*255)})' for r, g, b in colors]
+        # Plot every step-th point of dense scans (a view, no copy)
+        if MAX_PLOT_POINTS > 0 and len(points) > MAX_PLOT_POINTS:
+            step = -(-len(points) // MAX_PLOT_POINTS)
+            points = points[::step]
+        
+        # Color by distance (normalized to [0,1]) through Plotly's Viridis scale,
+        # sending one number per point instead of an rgb() string
+        distance = np.linalg.norm(points, axis=1)
+        max_distance = distance.max()
+        norm_distance = distance / max_distance if max_distance > 0 else np.zeros_like(distance)
+        marker_color = dict(color=norm_distance, colorscale='Viridis', cmin=0, cmax=1, showscale=False)
+        
+        if planar:
+            # Planar LIDAR points all have z = 0, so draw them top-down with
+            # WebGL, which stays responsive far beyond where Scatter3d stalls
+            fig = go.Figure(data=[
+                go.Scattergl(
+                    x=points[:, 0],
+                    y=points[:, 1],
+                    mode='markers',
+                    marker=dict(
+                        size=3,
+                        opacity=0.8,
+                        **marker_color
+                    )
+                )
+            ])
+            
+            # Native 2D axes replace the axis-line trace; keep X and Y to scale
+            fig.update_layout(
+                title=f"LIDAR Point Cloud (Timestamp: {timestamp or self.latest_timestamp})",
+                xaxis=dict(title='X (cm)'),
+                yaxis=dict(title='Y (cm)', scaleanchor='x', scaleratio=1),
+                margin=dict(l=0, r=0, b=0, t=40)
+            )
+            
+            return fig
         
         # Create scatter3d plot
         fig = go.Figure(data=[
@@ -245,8 +529,8 @@ class LidarVisualizer:
                 mode='markers',
                 marker=dict(
                     size=3,
-                    color=colors_rgb,
-                    opacity=0.8
+                    opacity=0.8,
+                    **marker_color
                 )
             )
         ])
@@ -254,30 +538,19 @@ class LidarVisualizer:
         # Add coordinate axes
         axis_length = max(np.max(np.abs(points[:, 0])), np.max(np.abs(points[:, 1])), np.max(np.abs(points[:, 2]))) * 0.1
         
-        # X-axis (red)
-        fig.add_trace(go.Scatter3d(
-            x=[0, axis_length], y=[0, 0], z=[0, 0],
-            line=dict(color='red', width=4),
-            name='X-axis'
-        ))
-        
-        # Y-axis (green)
-        fig.add_trace(go.Scatter3d(
-            x=[0, 0], y=[0, axis_length], z=[0, 0],
-            line=dict(color='green', width=4),
-            name='Y-axis'
-        ))
-        
-        # Z-axis (blue)
+        # X (red), Y (green) and Z (blue) axes as one trace, segments separated by None
         fig.add_trace(go.Scatter3d(
-            x=[0, 0], y=[0, 0], z=[0, axis_length],
-            line=dict(color='blue', width=4),
-            name='Z-axis'
+            x=[0, axis_length, None, 0, 0, None, 0, 0],
+            y=[0, 0, None, 0, axis_length, None, 0, 0],
+            z=[0, 0, None, 0, 0, None, 0, axis_length],
+            mode='lines',
+            line=dict(color=AXIS_COLORS, width=4),
+            name='Axes'
         ))
         
         # Update layout
         fig.update_layout(
-            title=f"LIDAR Point Cloud (Timestamp: {self.latest_timestamp})",
+            title=f"LIDAR Point Cloud (Timestamp: {timestamp or self.latest_timestamp})",
             scene=dict(
                 xaxis_title='X (cm)',
                 yaxis_title='Y (cm)',
@@ -289,7 +562,7 @@ class LidarVisualizer:
         
         return fig
     
-    def process_latest_scan(self):
+    def process_latest_scan(self, planar=True):
         """Process the latest scan and return a Plotly figure"""
         scan_data = self.get_latest_scan()
         
@@ -302,38 +575,59 @@ class LidarVisualizer:
             return None
         
         # Store the point cloud in memory for later use
-        self.point_cloud = self.create_open3d_point_cloud(points, colors)
+        self.store_point_cloud(points, colors)
         
         # Create and return a Plotly figure
-        return self.create_plotly_point_cloud(points, colors)
+        return self.create_plotly_point_cloud(points, planar=planar)
     
-    def process_scan_by_timestamp(self, timestamp):
+    def process_scan_by_timestamp(self, timestamp, planar=True):
         """Process a scan by timestamp and return a Plotly figure"""
-        scan_data = self.get_historical_scan(timestamp)
+        scan = self.get_scan_points(timestamp)
         
-        if not scan_data:
+        if scan is None:
             return None
         
-        points, colors = self.convert_readings_to_points(scan_data)
-        
-        if points is None or len(points) == 0:
-            return None
+        _, points, colors = scan
         
         # Store the point cloud in memory for later use
-        self.point_cloud = self.create_open3d_point_cloud(points, colors)
+        self.store_point_cloud(points, colors)
         
         # Create and return a Plotly figure
-        return self.create_plotly_point_cloud(points, colors)
+        return self.create_plotly_point_cloud(points, planar=planar, timestamp=timestamp)
+    
+    def get_figure_dict(self, timestamp, planar=True):
+        """Return a scan's Plotly figure as a dict, reusing recently built figures"""
+        key = (timestamp, planar)
+        with self._cache_lock:
+            figure = self._figure_cache.get(key)
+            if figure is not None:
+                self._figure_cache.move_to_end(key)
+                return figure
+        
+        # Build from the cached scan without touching the stored point cloud,
+        # since figures are also built for scans nobody is viewing
+        scan = self.get_scan_points(timestamp)
+        if scan is None:
+            return None
+        
+        fig = self.create_plotly_point_cloud(scan[1], planar=planar, timestamp=timestamp)
+        figure = fig.to_dict()
+        with self._cache_lock:
+            self._figure_cache[key] = figure
+            if len(self._figure_cache) > FIGURE_CACHE_SIZE:
+                self._figure_cache.popitem(last=False)
+        
+        return figure
     
     def save_point_cloud(self, filename):
         """Save the current point cloud to a file"""
-        if self.point_cloud is None:
+        if self._points is None:
             logger.warning("No point cloud to save")
             return False
         
         try:
-            # Save as PLY file
-            o3d.io.write_point_cloud(filename, self.point_cloud)
+            # Save as binary PLY file straight from the stored arrays, without building an Open3D cloud
+            write_binary_ply(filename, self._points, self._colors)
             logger.info(f"Point cloud saved to {filename}")
             return True
         except Exception as e:
@@ -343,14 +637,23 @@ class LidarVisualizer:
     def get_latest_metadata(self):
         """Get metadata about the latest scan"""
         if not self.latest_timestamp:
-            scan_data = self.get_latest_scan()
-            if not scan_data:
+            # Only the timestamp is needed, so skip loading the scan's readings
+            try:
+                with self.pool.get_reader() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute(SQL_LATEST_TIMESTAMP)
+                    self.latest_timestamp = cursor.fetchone()[0]
+            except sqlite3.Error as e:
+                logger.error(f"Database query error: {e}")
+                return {}
+            
+            if not self.latest_timestamp:
                 return {}
         
         return {
             "timestamp": self.latest_timestamp,
             "datetime": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.latest_timestamp)),
-            "point_count": len(self.point_cloud.points) if self.point_cloud else 0
+            "point_count": len(self._points) if self._points is not None else 0
         }
 
 # For testing/standalone use
@@ -386,7 +689,8 @@ if __name__ == "__main__":
     print(f"Generated {len(points)} points in point cloud")
     
     # Create and visualize
-    pcd = visualizer.create_open3d_point_cloud(points, colors)
+    visualizer.store_point_cloud(points, colors)
+    pcd = visualizer.point_cloud
     print("Displaying point cloud visualization...")
     visualizer.visualize_point_cloud(pcd)
     